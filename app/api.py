@@ -1,119 +1,887 @@
-import io
-from typing import Optional
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
+import numpy as np
 from fastapi import FastAPI, UploadFile, HTTPException, File
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
 from app.logger import get_logger
-from app.config import TOP_K
-from app.ingestion.loader import load_document
-from app.ingestion.chunker import chunk_text
+from app.config import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_PATH,
+    CONTEXT_COMPRESSION,
+    DEFAULT_COLLECTION,
+    EMBED_BATCH_SIZE,
+    MAX_BATCH_QUESTIONS,
+    MAX_FILE_SIZE_MB,
+    TOP_K,
+    UPLOAD_DIR,
+    WARM_UP_ON_STARTUP,
+)
+from app.ingestion.loader import count_pages, load_document, validate_extension, validate_file
+from app.ingestion.jobs import IngestionJob, IngestionJobQueue
+from app.ingestion.chunker import iter_document_chunks
+from app.vectorstore.collections import (
+    CollectionNotFoundError,
+    CollectionRegistry,
+    list_collections,
+    validate_collection_name,
+)
 from app.vectorstore.faiss_store import FaissVectorStore
-from app.ingestion.embedder import embed_chunks
-from app.retrieval.retriever import retrieve_context
+from app.vectorstore.segments import SegmentWriter
+from app.ingestion.embedder import ChunkDeduplicator, iter_embedded_batches
+from app.retrieval.retriever import (
+    embed_queries,
+    query_embedding_cache,
+    retrieve_context,
+    retrieve_context_batch,
+)
+from app.retrieval.compression import compress_context
+from app.retrieval.extractive import extract_answer, extract_answers, serves_extractively
+from app.retrieval.intent import detect_intent
 from app.retrieval.prompt import build_prompt
-from app.llm.model import generate_answer, tokenizer
+from app.utils.tokenizer_utils import iter_with_token_counts
+from app.cache.answer_cache import AnswerCache
+from app.ingestion import embedder
+from app.llm import model as llm
+from app.llm.model import generate_answer, generate_answers, get_tokenizer, stream_answer
 
 logger = get_logger()
 
+UPLOAD_READ_BLOCK_BYTES = 1024 * 1024
+
 app = FastAPI(
     title="Ask the Docs API",
     version="1.0.0",
     description="RAG backend for document Q&A"
 )
 
+class QueryFilters(BaseModel):
+    # every given condition must match; a chunk matches a page range if any of its pages do
+    doc_ids: Optional[List[str]] = None
+    file_names: Optional[List[str]] = None
+    page_from: Optional[int] = None
+    page_to: Optional[int] = None
+    uploaded_after: Optional[datetime] = None
+    uploaded_before: Optional[datetime] = None
+
 class QueryRequest(BaseModel):
     question: str
     top_k: Optional[int] = TOP_K
+    # ANN recall / latency knobs; ignored by the exact Flat index
+    nprobe: Optional[int] = None
+    ef_search: Optional[int] = None
+    filters: Optional[QueryFilters] = None
+
+class AnswerSource(BaseModel):
+    # a sentence an extractive answer was taken from; offsets are into the normalized document text
+    text: str
+    doc_id: Optional[str] = None
+    file_name: Optional[str] = None
+    page_start: Optional[int] = None
+    page_end: Optional[int] = None
+    start_char_pos: int
+    end_char_pos: int
+    score: float
 
 class QueryResponse(BaseModel):
     answer: str
+    # cache | extractive | llm
+    answer_path: str
+    sources: Optional[List[AnswerSource]] = None
 
-# maintain one vector store per app instance
-vector_store: Optional[FaissVectorStore] = None
+class BatchQueryRequest(BaseModel):
+    questions: List[str]
+    top_k: Optional[int] = TOP_K
+    nprobe: Optional[int] = None
+    ef_search: Optional[int] = None
+    # applied to every question
+    filters: Optional[QueryFilters] = None
 
-@app.get("/health")
-def health():
-    return {"status": "ok"}
+class BatchQueryResult(BaseModel):
+    question: str
+    answer: Optional[str] = None
+    answer_path: Optional[str] = None
+    sources: Optional[List[AnswerSource]] = None
+    error: Optional[str] = None
 
-@app.post("/ingest")
-async def ingest_document(file: UploadFile = File(...)):
-    global vector_store
+class CollectionSettings(BaseModel):
+    # float32 | fp16 | sq8 | pq; how the in-memory index encodes vectors
+    storage: str
+    # re-score compressed search shortlists with the float32 vectors; None keeps the current setting
+    rescore: Optional[bool] = None
+
+class BatchQueryResponse(BaseModel):
+    # one entry per question, in request order
+    results: List[BatchQueryResult]
+
+# named collections, each its own vector store; idle ones are unloaded under memory pressure
+collections = CollectionRegistry()
+
+# ingestion runs on a bounded worker pool so the event loop stays free for queries
+ingestion_jobs = IngestionJobQueue()
+
+# answers keyed by prompt and by question embedding, invalidated by new ingests
+answer_cache: Optional[AnswerCache] = AnswerCache() if ANSWER_CACHE_MAX_ENTRIES else None
+
+
+async def spool_upload(file: UploadFile) -> Tuple[str, int, str]:
+    """
+    Stream an upload to UPLOAD_DIR in fixed-size blocks, enforcing the size limit
+    without holding the whole file in memory. The bytes are hashed on the way
+    through. Returns (path, size, sha256 hex digest).
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    max_size_bytes = MAX_FILE_SIZE_MB * 1024 * 1024
+
+    extension = os.path.splitext(file.filename)[1].lower()
+    spool = tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, suffix=extension, delete=False)
+    file_size = 0
+    digest = hashlib.sha256()
+
+    try:
+        with spool:
+            while True:
+                block = await file.read(UPLOAD_READ_BLOCK_BYTES)
+                if not block:
+                    break
+
+                file_size += len(block)
+                if file_size > max_size_bytes:
+                    raise ValueError("File size exceeds allowed limit")
+
+                digest.update(block)
+                await run_in_threadpool(spool.write, block)
+
+    except Exception:
+        os.remove(spool.name)
+        raise
+
+    return spool.name, file_size, digest.hexdigest()
+
+
+def run_ingestion(
+    job: IngestionJob,
+    collection: str,
+    file_name: str,
+    file_path: str,
+    file_size: int,
+    file_hash: str,
+    uploaded_at: float,
+    doc_id: Optional[str] = None
+) -> dict:
+    """
+    Streaming ingestion pipeline executed on an ingestion worker thread.
+    Pages flow through chunking and embedding in fixed-size batches that are
+    indexed as they are produced, so memory does not grow with document size.
+    A file whose bytes were ingested before is not processed again, and
+    chunks whose text is already indexed reuse the stored embedding.
+
+    With doc_id the upload is a new version of that document: the previous
+    version stays searchable until the new segment commits and replaces it.
+    """
+    replaces = doc_id is not None
+    doc_id = doc_id or job.job_id
+
+    segment: Optional[SegmentWriter] = None
+    store: Optional[FaissVectorStore] = None
+    chunks_indexed = 0
+    pages_loaded = 0
 
     try:
-        contents = await file.read()
-        file_size = len(contents)
-
-        if file_size == 0:
-            raise ValueError("Uploaded file is empty")
-        
-        # document ingestion
-        text = load_document(
-            file_name = file.filename,
-            file = io.BytesIO(contents),
+        # pinned for the whole job so the collection is not unloaded mid-ingest
+        store = collections.acquire(
+            collection,
+            embedder.get_embedding_model().get_sentence_embedding_dimension()
+        )
+
+        existing = store.metadata.find_document(file_hash)
+        if existing is not None and (not replaces or existing["doc_id"] == doc_id):
+            logger.info(
+                f"Duplicate document skipped | job_id={job.job_id} | doc_id={existing['doc_id']}"
+            )
+            return {
+                "message": "Document already ingested",
+                "collection": collection,
+                "doc_id": existing["doc_id"],
+                "chunks_indexed": 0,
+                "chunks_new": 0,
+                "chunks_deduplicated": existing["chunk_count"],
+                "duplicate": True
+            }
+
+        job.update(stage="loading", progress=0.0)
+        page_count = count_pages(file_name, file_path)
+
+        def track_pages(pages):
+            nonlocal pages_loaded
+            for page in pages:
+                pages_loaded += 1
+                yield page
+
+        # document ingestion -> chunking -> embedding
+        pages = track_pages(load_document(
+            file_name = file_name,
+            file_path = file_path,
             file_size_bytes=file_size
+        ))
+        chunks = (
+            {**chunk, "doc_id": doc_id, "file_name": file_name, "uploaded_at": uploaded_at}
+            for chunk in iter_document_chunks(pages, get_tokenizer())
         )
+        # LLM token counts are stored with each chunk so prompt packing never re-tokenizes
+        chunks = iter_with_token_counts(chunks, get_tokenizer(), EMBED_BATCH_SIZE)
 
-        # chunking
-        chunks = chunk_text(text)
+        deduplicator = ChunkDeduplicator(store.find_embeddings)
 
-        # embedding
-        embeddings, metadata = embed_chunks(chunks)
+        # vector store: batches are appended to a new on-disk segment as they are produced
+        for embeddings, metadata in iter_embedded_batches(chunks, deduplicator=deduplicator):
+            if segment is None:
+                segment = store.segment_writer()
 
-        # vector store
-        if vector_store is None:
-            vector_store = FaissVectorStore(embeddings.shape[1])
+            segment.add(embeddings, metadata)
+            chunks_indexed += len(metadata)
 
-        vector_store.add(embeddings, metadata)
-        vector_store.save()
+            job.update(
+                stage="indexing",
+                progress=0.95 * pages_loaded / page_count if page_count else None
+            )
 
-        logger.info(
-            f"Document ingested successfully | chunks={len(chunks)}"
-        )
+        # the document becomes searchable only once its segment is committed
+        job.update(stage="committing", progress=0.95)
+        store.metadata.stage_document(segment.name, file_hash, doc_id, file_name, chunks_indexed)
+        # a doc_id that was never ingested is simply created
+        replaced = segment.commit() > 0
 
-        return {
-            "message" : "Document ingested successfully",
-            "chunks_indexed": len(chunks)
-        }
+    except Exception:
+        if segment is not None:
+            segment.abort()
+        raise
 
+    finally:
+        if store is not None:
+            collections.release(collection)
+        os.remove(file_path)
+
+    logger.info(
+        f"Document ingested successfully | job_id={job.job_id} | collection={collection} | doc_id={doc_id} | chunks={chunks_indexed} | "
+        f"new={deduplicator.chunks_new} | deduplicated={deduplicator.chunks_deduplicated}"
+    )
+
+    return {
+        "message" : "Document ingested successfully",
+        "collection": collection,
+        "doc_id": doc_id,
+        "replaced": replaced,
+        "chunks_indexed": chunks_indexed,
+        "chunks_new": deduplicator.chunks_new,
+        "chunks_deduplicated": deduplicator.chunks_deduplicated
+    }
+
+
+# "loading" until the startup warm-up finishes, then "ready" (or "failed")
+model_status = {"status": "loading", "error": None}
+
+
+def warm_up_models() -> None:
+    """
+    Load both models and run a warm-up pass off the request path.
+    """
+    try:
+        embedder.warm_up()
+        llm.warm_up()
+        model_status["status"] = "ready"
     except Exception as e:
-        logger.exception("Document ingestion failed")
-        raise HTTPException(status_code=400, detail=str(e))
+        logger.exception("Model warm-up failed")
+        model_status["status"] = "failed"
+        model_status["error"] = str(e)
+
+
+@app.on_event("startup")
+def start_model_warm_up():
+    if WARM_UP_ON_STARTUP:
+        threading.Thread(target=warm_up_models, name="model-warm-up", daemon=True).start()
 
-    
-@app.post("/query", response_model=QueryResponse)
-def query_document(request: QueryRequest):
-    global vector_store
 
-    if vector_store is None:
+@app.on_event("startup")
+def load_answer_cache():
+    if answer_cache is not None and ANSWER_CACHE_PATH:
         try:
-            vector_store = FaissVectorStore.load()
-            logger.info("FAISS index loaded from disk")
+            answer_cache.load(ANSWER_CACHE_PATH)
         except Exception:
+            logger.exception("Failed to load answer cache; starting empty")
+
+
+@app.on_event("shutdown")
+def shutdown_ingestion_jobs():
+    ingestion_jobs.shutdown()
+
+
+@app.on_event("shutdown")
+def save_answer_cache():
+    if answer_cache is not None and ANSWER_CACHE_PATH:
+        answer_cache.save(ANSWER_CACHE_PATH)
+
+
+@app.on_event("shutdown")
+def close_collections():
+    collections.close()
+
+@app.get("/health")
+def health():
+    # liveness only; see /ready for model state
+    return {"status": "ok"}
+
+@app.get("/ready")
+def ready():
+    models = {"embedding": embedder.is_ready(), "llm": llm.is_ready()}
+
+    if not all(models.values()):
+        status = model_status["status"] if model_status["status"] == "failed" else "loading"
+        return JSONResponse(
+            status_code=503,
+            content={"status": status, "error": model_status["error"], "models": models}
+        )
+
+    return {"status": "ready", "models": models}
+
+async def submit_ingestion(collection: str, file: UploadFile, doc_id: Optional[str] = None) -> Dict:
+    try:
+        validate_collection_name(collection)
+
+        file_name = file.filename
+        validate_extension(file_name)
+
+        file_path, file_size, file_hash = await spool_upload(file)
+        uploaded_at = time.time()
+
+        try:
+            # reject bad uploads before they take a worker slot
+            validate_file(file_name, file_size)
+
+            job = ingestion_jobs.submit(
+                file_name,
+                lambda job: run_ingestion(
+                    job, collection, file_name, file_path, file_size, file_hash, uploaded_at, doc_id
+                )
+            )
+        except Exception:
+            os.remove(file_path)
+            raise
+
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    except Exception as e:
+        logger.exception("Document upload failed")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "message": "Document accepted for ingestion",
+        "collection": collection,
+        "doc_id": doc_id or job.job_id,
+        "job_id": job.job_id,
+        "status": job.status
+    }
+
+
+@app.post("/ingest", status_code=202)
+async def ingest_document(file: UploadFile = File(...)):
+    return await submit_ingestion(DEFAULT_COLLECTION, file)
+
+
+@app.post("/collections/{name}/ingest", status_code=202)
+async def ingest_collection_document(name: str, file: UploadFile = File(...)):
+    return await submit_ingestion(name, file)
+
+
+@app.put("/documents/{doc_id}", status_code=202)
+async def update_document(doc_id: str, file: UploadFile = File(...)):
+    return await submit_ingestion(DEFAULT_COLLECTION, file, doc_id)
+
+
+@app.put("/collections/{name}/documents/{doc_id}", status_code=202)
+async def update_collection_document(name: str, doc_id: str, file: UploadFile = File(...)):
+    return await submit_ingestion(name, file, doc_id)
+
+
+@app.get("/ingest/{job_id}")
+def ingestion_status(job_id: str):
+    job = ingestion_jobs.get(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+
+    return job.to_dict()
+
+
+@app.get("/collections")
+def get_collections():
+    return {"collections": list_collections(), **collections.stats()}
+
+
+@app.put("/collections/{name}")
+def configure_collection(name: str, settings: CollectionSettings):
+    """
+    Create a collection or change its storage mode. An existing index is
+    re-encoded in the background; queries keep working meanwhile.
+    """
+    try:
+        store = collections.acquire(
+            name,
+            embedder.get_embedding_model().get_sentence_embedding_dimension()
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        store.configure_storage(settings.storage, settings.rescore)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        collections.release(name)
+
+    return {
+        "collection": name,
+        "storage": store.storage,
+        "rescore": store.rescore,
+        # differs from storage until the re-encode finishes or, for sq8 / pq, enough vectors arrive
+        "index_storage": store.index_storage,
+    }
+
+
+def acquire_collection(name: str) -> FaissVectorStore:
+    """
+    Pin a collection's vector store for a query, loading it from disk if it
+    is not resident. Callers release it once retrieval is done.
+    """
+    try:
+        return collections.acquire(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CollectionNotFoundError:
+        if name == DEFAULT_COLLECTION:
             raise HTTPException(
                 status_code = 400,
                 detail = "No document indexed yet. Please ingest as document first."
             )
-        
+        raise HTTPException(status_code=404, detail=f"Collection '{name}' not found")
+    except Exception:
+        logger.exception(f"Failed to load collection | collection={name}")
+        raise HTTPException(status_code=400, detail=f"Collection '{name}' could not be loaded")
+
+
+def delete_document(collection: str, doc_id: str) -> Dict:
+    store = acquire_collection(collection)
+
     try:
-        # retrieval
-        retrieved_chunks = retrieve_context(
-            query=request.question,
-            store=vector_store,
-            top_k=request.top_k
+        chunks_deleted = store.delete_document(doc_id)
+    finally:
+        collections.release(collection)
+
+    if chunks_deleted is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    return {
+        "message": "Document deleted",
+        "collection": collection,
+        "doc_id": doc_id,
+        "chunks_deleted": chunks_deleted
+    }
+
+
+@app.delete("/documents/{doc_id}")
+def delete_default_document(doc_id: str):
+    return delete_document(DEFAULT_COLLECTION, doc_id)
+
+
+@app.delete("/collections/{name}/documents/{doc_id}")
+def delete_collection_document(name: str, doc_id: str):
+    return delete_document(name, doc_id)
+
+
+def search_filters(filters: Optional[QueryFilters]) -> Optional[Dict]:
+    """
+    Request filters as keyword arguments for the vector store, or None.
+    """
+    if filters is None:
+        return None
+
+    values = {
+        "doc_ids": filters.doc_ids,
+        "file_names": filters.file_names,
+        "page_from": filters.page_from,
+        "page_to": filters.page_to,
+        "uploaded_after": filters.uploaded_after.timestamp() if filters.uploaded_after else None,
+        "uploaded_before": filters.uploaded_before.timestamp() if filters.uploaded_before else None,
+    }
+
+    return {key: value for key, value in values.items() if value is not None} or None
+
+
+def semantic_cacheable(request: Union[QueryRequest, BatchQueryRequest], filters: Optional[Dict]) -> bool:
+    """
+    The semantic tier keys on the question alone, so it only serves and
+    stores answers retrieved with the default filters and search settings.
+    """
+    return (
+        answer_cache is not None
+        and filters is None
+        and request.top_k in (None, TOP_K)
+        and request.nprobe is None
+        and request.ef_search is None
+    )
+
+
+def prepare_query(request: QueryRequest, store: FaissVectorStore) -> Dict:
+    """
+    Shared front half of /query and /query/stream: answer-cache lookups,
+    retrieval, the extractive fast path and prompt construction. "answer"
+    is set when the cache or the extractive path has one; otherwise
+    "prompt" is ready for generation. "answer_path" names who answered.
+    """
+    index_version = store.index_version
+    query_embedding = embed_queries([request.question])[0]
+    filters = search_filters(request.filters)
+    semantic = semantic_cacheable(request, filters)
+
+    # semantic tier: a near-identical question skips retrieval and generation.
+    # Filtered or tuned queries only use the exact tier.
+    if semantic and request.question.strip():
+        answer = answer_cache.get_for_question(query_embedding, index_version)
+        if answer is not None:
+            return {"answer": answer, "answer_path": "cache", "chunks": [], "prompt": None}
+
+    # retrieval
+    retrieved_chunks = retrieve_context(
+        query=request.question,
+        store=store,
+        top_k=request.top_k,
+        nprobe=request.nprobe,
+        ef_search=request.ef_search,
+        query_embedding=query_embedding,
+        filters=filters
+    )
+
+    # extractive fast path: the answer is the best matching sentences, no generation
+    intent = detect_intent(request.question)
+    if serves_extractively(intent):
+        extracted = extract_answer(intent, query_embedding, retrieved_chunks)
+        if extracted is not None:
+            return {
+                "answer": extracted["answer"],
+                "answer_path": "extractive",
+                "sources": extracted["sources"],
+                "chunks": retrieved_chunks,
+                "prompt": None,
+            }
+
+    # prompt construction, from the most relevant sentences when the chunks overflow the budget
+    context_chunks = retrieved_chunks
+    if CONTEXT_COMPRESSION:
+        context_chunks = compress_context(
+            [request.question], query_embedding[None, :], [retrieved_chunks], get_tokenizer()
+        )[0]
+
+    prompt = build_prompt(
+        question=request.question,
+        retrieved_chunks=context_chunks,
+        tokenizer=get_tokenizer()
+    )
+
+    # exact tier: the same prompt was answered against this index version
+    answer = answer_cache.get_for_prompt(prompt, index_version) if answer_cache is not None else None
+
+    return {
+        "answer": answer,
+        "answer_path": "cache" if answer is not None else "llm",
+        "chunks": retrieved_chunks,
+        "prompt": prompt,
+        "question": request.question,
+        "query_embedding": query_embedding,
+        "index_version": index_version,
+        "semantic": semantic,
+    }
+
+
+def cache_answer(query: Dict, answer: str) -> None:
+    if answer_cache is not None:
+        answer_cache.put(
+            query["question"],
+            query["query_embedding"] if query.get("semantic") else None,
+            query["prompt"],
+            query["index_version"],
+            answer
         )
 
-        # prompt construction
-        prompt = build_prompt(
-            question=request.question,
-            retrieved_chunks=retrieved_chunks,
-            tokenizer=tokenizer
+
+def answer_query(collection: str, request: QueryRequest) -> QueryResponse:
+    start = time.perf_counter()
+    store = acquire_collection(collection)
+
+    try:
+        try:
+            query = prepare_query(request, store)
+        finally:
+            collections.release(collection)
+
+        answer = query["answer"]
+        if answer is None:
+            answer = generate_answer(query["prompt"])
+            cache_answer(query, answer)
+
+        logger.info(
+            f"Query answered | path={query['answer_path']} | seconds={time.perf_counter() - start:.3f}"
         )
 
-        answer = generate_answer(prompt)
+        return QueryResponse(answer=answer, answer_path=query["answer_path"], sources=query.get("sources"))
+    except Exception as e:
+        logger.exception("Query processing failed")
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/query", response_model=QueryResponse)
+def query_document(request: QueryRequest):
+    return answer_query(DEFAULT_COLLECTION, request)
+
 
-        return QueryResponse(answer=answer)
+@app.post("/collections/{name}/query", response_model=QueryResponse)
+def query_collection(name: str, request: QueryRequest):
+    return answer_query(name, request)
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {
+        "answers": answer_cache.stats() if answer_cache is not None else None,
+        "query_embeddings": query_embedding_cache.stats() if query_embedding_cache is not None else None,
+    }
+
+
+def sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_query(collection: str, request: QueryRequest) -> StreamingResponse:
+    """
+    Server-sent events: one `chunks` event with the retrieved chunk ids,
+    then a `token` event per decoded piece of the answer, then `done` with
+    the answer path. A failure during generation is reported as an `error` event.
+    """
+    store = acquire_collection(collection)
+
+    try:
+        try:
+            query = prepare_query(request, store)
+        finally:
+            collections.release(collection)
+
+        tokens = stream_answer(query["prompt"]) if query["answer"] is None else None
     except Exception as e:
         logger.exception("Query processing failed")
         raise HTTPException(status_code=400, detail=str(e))
 
+    def events() -> Iterator[str]:
+        yield sse_event("chunks", {
+            "chunks": [
+                {
+                    "doc_id": chunk.get("doc_id"),
+                    "chunk_id": chunk.get("chunk_id"),
+                    "chunk_ids": chunk.get("chunk_ids", [chunk.get("chunk_id")]),
+                    "file_name": chunk.get("file_name"),
+                    "page_start": chunk.get("page_start"),
+                    "page_end": chunk.get("page_end"),
+                    "score": chunk["score"]
+                }
+                for chunk in query["chunks"]
+            ]
+        })
+
+        done = {"answer_path": query["answer_path"]}
+        if query.get("sources") is not None:
+            done["sources"] = query["sources"]
+
+        if tokens is None:
+            # cached and extractive answers arrive in one piece
+            yield sse_event("token", {"text": query["answer"]})
+            yield sse_event("done", done)
+            return
+
+        pieces = []
+        try:
+            for text in tokens:
+                pieces.append(text)
+                yield sse_event("token", {"text": text})
+        except Exception as e:
+            logger.exception("Streaming generation failed")
+            yield sse_event("error", {"detail": str(e)})
+            return
+
+        cache_answer(query, "".join(pieces).strip())
+        yield sse_event("done", done)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/query/stream")
+def query_document_stream(request: QueryRequest):
+    return stream_query(DEFAULT_COLLECTION, request)
+
+
+@app.post("/collections/{name}/query/stream")
+def query_collection_stream(name: str, request: QueryRequest):
+    return stream_query(name, request)
+
+
+def answer_batch(collection: str, request: BatchQueryRequest) -> BatchQueryResponse:
+    """
+    Answer many questions with one embedding call, one multi-row FAISS search
+    and batched generation. Failures are reported per question.
+    """
+    if len(request.questions) > MAX_BATCH_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_QUESTIONS} questions per batch"
+        )
+
+    store = acquire_collection(collection)
+
+    results = [BatchQueryResult(question=question) for question in request.questions]
+
+    pending = []
+    for i, question in enumerate(request.questions):
+        if question and question.strip():
+            pending.append(i)
+        else:
+            results[i].error = "Query cannot be empty"
+
+    try:
+        index_version = store.index_version
+        filters = search_filters(request.filters)
+        semantic = semantic_cacheable(request, filters)
+        query_embeddings = embed_queries([request.questions[i] for i in pending])
+        embeddings = dict(zip(pending, query_embeddings))
+
+        # semantic cache tier (not for filtered or tuned queries, see prepare_query)
+        if semantic:
+            for i in pending:
+                results[i].answer = answer_cache.get_for_question(embeddings[i], index_version)
+                if results[i].answer is not None:
+                    results[i].answer_path = "cache"
+
+        to_retrieve = [i for i in pending if results[i].answer is None]
+
+        # retrieval
+        try:
+            retrieved = retrieve_context_batch(
+                queries=[request.questions[i] for i in to_retrieve],
+                store=store,
+                top_k=request.top_k,
+                nprobe=request.nprobe,
+                ef_search=request.ef_search,
+                query_embeddings=np.array([embeddings[i] for i in to_retrieve], dtype=np.float32),
+                filters=filters
+            ) if to_retrieve else []
+        finally:
+            collections.release(collection)
+            store = None
+
+        # extractive fast path, one sentence-encode call for all questions
+        intents = [detect_intent(request.questions[i]) for i in to_retrieve]
+        extracted = extract_answers(
+            intents,
+            np.array([embeddings[i] for i in to_retrieve], dtype=np.float32),
+            retrieved
+        ) if any(serves_extractively(intent) for intent in intents) else [None] * len(to_retrieve)
+
+        for i, result in zip(to_retrieve, extracted):
+            if result is not None:
+                results[i].answer = result["answer"]
+                results[i].answer_path = "extractive"
+                results[i].sources = [AnswerSource(**source) for source in result["sources"]]
+
+        # context compression, one sentence-encode call for the questions still to generate
+        to_generate = [k for k, i in enumerate(to_retrieve) if results[i].answer is None]
+        if CONTEXT_COMPRESSION and to_generate:
+            compressed = compress_context(
+                [request.questions[to_retrieve[k]] for k in to_generate],
+                np.array([embeddings[to_retrieve[k]] for k in to_generate], dtype=np.float32),
+                [retrieved[k] for k in to_generate],
+                get_tokenizer()
+            )
+            for k, chunks in zip(to_generate, compressed):
+                retrieved[k] = chunks
+
+        # prompt construction, then the exact cache tier
+        prompts = {}
+        for i, retrieved_chunks in zip(to_retrieve, retrieved):
+            if results[i].answer is not None:
+                continue
+
+            try:
+                prompt = build_prompt(
+                    question=request.questions[i],
+                    retrieved_chunks=retrieved_chunks,
+                    tokenizer=get_tokenizer()
+                )
+            except Exception as e:
+                results[i].error = str(e)
+                continue
+
+            if answer_cache is not None:
+                results[i].answer = answer_cache.get_for_prompt(prompt, index_version)
+            if results[i].answer is None:
+                prompts[i] = prompt
+            else:
+                results[i].answer_path = "cache"
+
+        # generation
+        answers = generate_answers(list(prompts.values()))
+        for i, answer in zip(prompts, answers):
+            results[i].answer = answer
+            results[i].answer_path = "llm"
+            cache_answer({
+                "question": request.questions[i],
+                "query_embedding": embeddings[i],
+                "prompt": prompts[i],
+                "index_version": index_version,
+                "semantic": semantic,
+            }, answer)
+
+    except Exception as e:
+        logger.exception("Batch query processing failed")
+        if store is not None:
+            collections.release(collection)
+        for i in pending:
+            if results[i].answer is None and results[i].error is None:
+                results[i].error = str(e)
+
+    logger.info(
+        f"Batch query completed | questions={len(results)} | "
+        f"extractive={sum(1 for r in results if r.answer_path == 'extractive')} | "
+        f"failed={sum(1 for r in results if r.error is not None)}"
+    )
+
+    return BatchQueryResponse(results=results)
+
+
+@app.post("/query/batch", response_model=BatchQueryResponse)
+def query_documents_batch(request: BatchQueryRequest):
+    return answer_batch(DEFAULT_COLLECTION, request)
+
+
+@app.post("/collections/{name}/query/batch", response_model=BatchQueryResponse)
+def query_collection_batch(name: str, request: BatchQueryRequest):
+    return answer_batch(name, request)
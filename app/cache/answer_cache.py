@@ -0,0 +1,274 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import hashlib
+import os
+import threading
+import time
+import numpy as np
+
+from app.cache.lru import LRUCache
+from app.config import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_TTL_SECONDS,
+    SEMANTIC_CACHE_THRESHOLD,
+)
+from app.logger import get_logger
+from app.vectorstore.segments import TMP_SUFFIX, fsync_dir
+
+logger = get_logger()
+
+
+def prompt_key(prompt: str, index_version: str) -> str:
+    return hashlib.sha256(f"{index_version}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+def split_index_version(index_version: str) -> Tuple[str, int]:
+    """
+    (store id, version) of a FaissVectorStore.index_version.
+    """
+    store_id, _, version = index_version.rpartition(":")
+    return store_id, int(version)
+
+
+class SemanticAnswerCache:
+    """
+    Answers keyed by question embedding. A lookup is one matrix-vector
+    product over all cached questions; the most similar one is a hit when
+    its cosine similarity reaches the threshold and it was answered against
+    the same index version. Collections share the cache, so a slot is only
+    reused early when it expired or holds an older version of the same
+    store; otherwise the least recently used one is evicted.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        threshold: float,
+        ttl_seconds: Optional[float] = None
+    ):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+
+        # allocated on first put, once the embedding dimension is known
+        self._embeddings: Optional[np.ndarray] = None
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._versions = np.full(max_entries, "", dtype=object)
+        self._store_ids = np.full(max_entries, "", dtype=object)
+        self._version_numbers = np.zeros(max_entries, dtype=np.int64)
+        self._stored_at = np.zeros(max_entries, dtype=np.float64)
+        self._answers = [None] * max_entries
+        self._questions = [None] * max_entries
+
+        # slot -> None, least recently used first
+        self._lru: "OrderedDict[int, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _live(self, index_version: str) -> np.ndarray:
+        live = self._valid & (self._versions == index_version)
+        if self.ttl_seconds is not None:
+            live &= time.time() - self._stored_at <= self.ttl_seconds
+        return live
+
+    def _reusable(self, index_version: str) -> np.ndarray:
+        # entries of other stores stay until LRU eviction; they may still be current there
+        store_id, version = split_index_version(index_version)
+        reusable = ~self._valid | (
+            (self._store_ids == store_id) & (self._version_numbers < version)
+        )
+        if self.ttl_seconds is not None:
+            reusable |= time.time() - self._stored_at > self.ttl_seconds
+        return reusable
+
+    def get(self, embedding: np.ndarray, index_version: str) -> Optional[str]:
+        with self._lock:
+            if self._embeddings is not None:
+                live = self._live(index_version)
+
+                if live.any():
+                    similarity = np.where(live, self._embeddings @ embedding, -np.inf)
+                    best = int(np.argmax(similarity))
+
+                    if similarity[best] >= self.threshold:
+                        self._lru.move_to_end(best)
+                        self.hits += 1
+                        return self._answers[best]
+
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        question: str,
+        embedding: np.ndarray,
+        index_version: str,
+        answer: str,
+        stored_at: Optional[float] = None
+    ) -> None:
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = np.zeros((self.max_entries, embedding.shape[0]), dtype=np.float32)
+
+            # empty slots first, then superseded or expired ones, then the least recently used
+            reusable = np.flatnonzero(~self._valid)
+            if not len(reusable):
+                reusable = np.flatnonzero(self._reusable(index_version))
+
+            if len(reusable):
+                slot = int(reusable[0])
+                self._lru.pop(slot, None)
+            else:
+                slot, _ = self._lru.popitem(last=False)
+                self.evictions += 1
+
+            self._embeddings[slot] = embedding
+            self._valid[slot] = True
+            self._versions[slot] = index_version
+            self._store_ids[slot], self._version_numbers[slot] = split_index_version(index_version)
+            self._stored_at[slot] = time.time() if stored_at is None else stored_at
+            self._answers[slot] = answer
+            self._questions[slot] = question
+            self._lru[slot] = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._valid[:] = False
+            self._lru.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": int(self._valid.sum()),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+class AnswerCache:
+    """
+    Two-tier cache in front of generation.
+
+    - exact: sha256 of (index version, final prompt) -> answer. Saves
+      generation when retrieval produces a prompt that was answered before.
+    - semantic: question embedding -> answer, for the same or nearly the
+      same question. Checked before retrieval, so a hit skips both.
+
+    Entries are tied to the vector store's index version, so answers from
+    before an ingest are never served after it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: Optional[float] = ANSWER_CACHE_TTL_SECONDS,
+        semantic_threshold: Optional[float] = SEMANTIC_CACHE_THRESHOLD
+    ):
+        self.exact = LRUCache(max_entries, ttl_seconds)
+        self.semantic = (
+            SemanticAnswerCache(max_entries, semantic_threshold, ttl_seconds)
+            if semantic_threshold is not None else None
+        )
+
+    def get_for_question(self, embedding: np.ndarray, index_version: str) -> Optional[str]:
+        if self.semantic is None:
+            return None
+        return self.semantic.get(embedding, index_version)
+
+    def get_for_prompt(self, prompt: str, index_version: str) -> Optional[str]:
+        return self.exact.get(prompt_key(prompt, index_version))
+
+    def put(
+        self,
+        question: str,
+        embedding: Optional[np.ndarray],
+        prompt: str,
+        index_version: str,
+        answer: str
+    ) -> None:
+        # without an embedding only the exact tier is filled
+        self.exact.put(prompt_key(prompt, index_version), answer)
+        if self.semantic is not None and embedding is not None:
+            self.semantic.put(question, embedding, index_version, answer)
+
+    def clear(self) -> None:
+        self.exact.clear()
+        if self.semantic is not None:
+            self.semantic.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "exact": self.exact.stats(),
+            "semantic": self.semantic.stats() if self.semantic is not None else None,
+        }
+
+    def save(self, path: str) -> None:
+        """
+        Write live entries to an .npz file (atomically).
+        """
+        exact = list(self.exact.items())
+        arrays = {
+            "exact_keys": np.array([key for key, _, _ in exact], dtype=str),
+            "exact_answers": np.array([answer for _, answer, _ in exact], dtype=str),
+            "exact_stored_at": np.array([stored_at for _, _, stored_at in exact], dtype=np.float64),
+        }
+
+        semantic = self.semantic
+        if semantic is not None and semantic._embeddings is not None:
+            with semantic._lock:
+                slots = [slot for slot in semantic._lru if semantic._valid[slot]]
+                arrays.update({
+                    "semantic_questions": np.array([semantic._questions[s] for s in slots], dtype=str),
+                    "semantic_embeddings": semantic._embeddings[slots],
+                    "semantic_versions": np.array([semantic._versions[s] for s in slots], dtype=str),
+                    "semantic_answers": np.array([semantic._answers[s] for s in slots], dtype=str),
+                    "semantic_stored_at": semantic._stored_at[slots],
+                })
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + TMP_SUFFIX
+
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, path)
+        fsync_dir(os.path.dirname(path) or ".")
+
+        logger.info(f"Answer cache saved | path={path} | exact={len(exact)}")
+
+    def load(self, path: str) -> None:
+        """
+        Restore entries written by save(); entries past their TTL are dropped on lookup.
+        """
+        if not os.path.exists(path):
+            return
+
+        with np.load(path, allow_pickle=False) as data:
+            for key, answer, stored_at in zip(
+                data["exact_keys"], data["exact_answers"], data["exact_stored_at"]
+            ):
+                self.exact.put(str(key), str(answer), stored_at=float(stored_at))
+
+            if self.semantic is not None and "semantic_embeddings" in data:
+                for question, embedding, version, answer, stored_at in zip(
+                    data["semantic_questions"],
+                    data["semantic_embeddings"],
+                    data["semantic_versions"],
+                    data["semantic_answers"],
+                    data["semantic_stored_at"],
+                ):
+                    self.semantic.put(
+                        str(question), embedding, str(version), str(answer), stored_at=float(stored_at)
+                    )
+
+        logger.info(f"Answer cache loaded | path={path} | exact={len(self.exact)}")
@@ -0,0 +1,88 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterator, Optional, Tuple
+import threading
+import time
+
+
+class LRUCache:
+    """
+    Thread-safe bounded mapping with least-recently-used eviction, an
+    optional time-to-live and hit / miss counters.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        if max_entries <= 0:
+            raise ValueError("Cache capacity must be positive")
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (value, stored_at)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - stored_at > self.ttl_seconds
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and self._expired(entry[1], time.time()):
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, stored_at: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time() if stored_at is None else stored_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def items(self) -> Iterator[Tuple[Hashable, Any, float]]:
+        """
+        Snapshot of live entries, least recently used first: (key, value, stored_at).
+        """
+        with self._lock:
+            now = time.time()
+            return iter([
+                (key, value, stored_at)
+                for key, (value, stored_at) in self._entries.items()
+                if not self._expired(stored_at, now)
+            ])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
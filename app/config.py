@@ -1,24 +1,113 @@
+import os
+
 # Models
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 LLM_MODEL = "google/flan-t5-large"
+# pre-converted artifacts baked by `python -m app.prepare_models`, next to the app package
+# so bake and serve agree whatever the working directory
+MODEL_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+WARM_UP_ON_STARTUP = True  # load and warm models in the background at startup instead of on first request
 
 # OCR
-MIN_TEXT_LENGTH = 500  # threshold to decide OCR fallback
+MIN_PAGE_TEXT_LENGTH = 50  # pages with less extracted text fall back to OCR
+OCR_DPI = 300
+
+# Document loading
+MAX_FILE_SIZE_MB = 512
+PDF_WORKERS = None  # PDF extraction / OCR processes; None = all CPUs available to the container
+PDF_PARALLEL_MIN_PAGES = 16  # smaller PDFs are extracted in-process
+TEXT_BLOCK_CHARS = 1_000_000  # .txt files are streamed in blocks of this size
 
 # chunking
+CHUNKING_MODE = "chars"  # chars | tokens (chunks sized in LLM tokens to fit the prompt budget)
 CHUNK_SIZE = 500
 CHUNK_OVERLAP = 100
+CHUNK_TOKENS = None  # tokens mode chunk size; None = (MAX_CONTEXT_TOKENS - PROMPT_RESERVED_TOKENS) // TOP_K
+CHUNK_OVERLAP_TOKENS = None  # tokens mode overlap; None = 20% of the chunk size
+PROMPT_RESERVED_TOKENS = 64  # share of MAX_CONTEXT_TOKENS kept for the instruction and question
+TOKENIZE_PAGE_BATCH = 16  # pages per batched tokenizer call in tokens mode
+
+# Embedding
+EMBED_BATCH_SIZE = 64  # chunks embedded and indexed per batch during ingestion
+EMBED_DEDUP_CACHE_SIZE = 4096  # recent chunk embeddings kept per ingest to reuse for repeated text
 
 # Retrieval
 TOP_K = 4
+RETRIEVAL_CANDIDATES_MULTIPLIER = 3  # hits fetched per requested chunk for merging and MMR
+MERGE_OVERLAPPING_HITS = True  # join hits from the same document whose char spans overlap or touch
+MMR_LAMBDA = 0.7  # relevance vs diversity trade-off for MMR reranking; 1.0 disables it
+QUERY_EMBEDDING_CACHE_SIZE = 4096  # cached question embeddings; 0 disables the cache
+HYBRID_SEARCH = True  # fuse BM25 keyword hits with vector hits by reciprocal rank fusion
+BM25_K1 = 1.2  # term frequency saturation
+BM25_B = 0.75  # document length normalization
+RRF_K = 60  # reciprocal rank fusion damping; larger values flatten the rank weights
+
+# Ingestion jobs
+INGEST_WORKERS = 2  # concurrent ingestion pipelines
+INGEST_MAX_PENDING_JOBS = 16  # queued + running jobs before /ingest rejects uploads
+INGEST_JOB_HISTORY = 100  # finished jobs kept for status polling
 
 # Generation
 MAX_NEW_TOKENS = 512
 MAX_CONTEXT_TOKENS = 350
+CONTEXT_COMPRESSION = True  # when retrieved chunks exceed the budget, keep only their sentences closest to the question
 
 TEMPERATURE = 0.2
+GENERATION_BATCH_SIZE = 8  # max prompts per padded model.generate call
+GENERATION_BATCH_WAIT_MS = 10  # how long the scheduler waits to fill a batch
+
+# Extractive answers
+EXTRACTIVE_INTENTS = {}  # intent -> sentences returned without the LLM, e.g. {"definition": 2, "extractive": 5}; other intents are generated
+EXTRACTIVE_MIN_SCORE = 0.35  # best sentence similarity to the question below which the LLM answers instead
+EXTRACTIVE_MIN_SENTENCE_CHARS = 20  # shorter sentences (headings, list markers) are not candidates
+
+# LLM backend
+LLM_BACKEND = "torch_fp32"  # torch_fp32 | torch_int8 | onnx | bnb4 (needs a GPU)
+LLM_NUM_THREADS = None  # intra-op threads for torch / ONNX Runtime; None = all CPUs available to the container
+
+# Answer cache
+ANSWER_CACHE_MAX_ENTRIES = 1024  # per tier; 0 disables the cache
+ANSWER_CACHE_TTL_SECONDS = 24 * 3600  # None = entries only leave by LRU eviction or a new ingest
+SEMANTIC_CACHE_THRESHOLD = 0.95  # question cosine similarity for a semantic hit; None disables that tier
+ANSWER_CACHE_PATH = None  # e.g. "app/storage/answer_cache.npz" to keep answers across restarts
+
+# Batch queries
+MAX_BATCH_QUESTIONS = 256
 
 # Paths
 STORAGE_DIR = "app/storage"
-INDEX_PATH = "app/storage/index/faiss.index"
-METADATA_PATH = "app/storage/metadata.json"
\ No newline at end of file
+UPLOAD_DIR = "app/storage/uploads"  # uploads are spooled here until their ingestion job finishes
+INDEX_DIR = "app/storage/index"  # segment files, manifest.json and chunk metadata database
+COLLECTIONS_DIR = "app/storage/collections"  # one INDEX_DIR-like directory per named collection
+
+# Collections
+DEFAULT_COLLECTION = "default"  # backs /ingest and /query; stored in INDEX_DIR
+COLLECTION_MEMORY_BUDGET_MB = 2048  # resident index memory; least recently used collections are unloaded
+
+# Index persistence
+MAX_SEGMENTS = 8  # background compaction starts above this many segments
+TOMBSTONE_COMPACTION_RATIO = 0.2  # deleted / indexed vectors above which deleted vectors are purged in the background
+SEGMENT_LOAD_BATCH_SIZE = 10_000  # vectors added to FAISS per batch when loading segments
+COMMIT_ADD_BATCH_SIZE = 1_000  # vectors a commit adds to the live index per lock hold; bounds how long queries wait on HNSW inserts
+METADATA_MMAP_BYTES = 256 * 1024 * 1024  # SQLite memory-mapped I/O window for chunk metadata
+
+# Vector index
+INDEX_TYPE = "hnsw"  # flat | ivf_flat | hnsw | ivf_pq
+ANN_PROMOTION_THRESHOLD = 50_000  # Flat index is rebuilt as INDEX_TYPE past this many vectors
+ANN_TRAIN_SAMPLE_SIZE = 50_000  # vectors sampled to train IVF / PQ quantizers
+IVF_NLIST = None  # inverted lists; None = ~4 * sqrt(num vectors)
+IVF_NPROBE = 16  # default lists scanned per query
+PQ_M = 48  # PQ sub-quantizers for ivf_pq and pq storage, must divide the embedding dim (384)
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64  # default candidate list size per query
+FILTER_EXACT_SEARCH_MAX = 10_000  # filtered searches matching at most this many chunks score them exactly; larger ones use a FAISS ID selector
+
+# Vector storage
+VECTOR_STORAGE = "float32"  # float32 | fp16 | sq8 | pq; in-memory encoding of new collections, changeable per collection
+STORAGE_RESCORE = True  # re-score a compressed index's shortlist with the float32 segment vectors
+RESCORE_CANDIDATES_MULTIPLIER = 4  # shortlist size per requested hit when re-scoring fp16 / sq8 (recall@4 1.0 at 12k vectors)
+# PQ codes rank too coarsely for a short shortlist: at 12k vectors (benchmarks.storage_benchmark,
+# synthetic) recall@4 was 0.28 without re-scoring, 0.53 at 4x, 0.83 at 16x, 0.97 at 32x and 1.0 at 64x
+PQ_RESCORE_CANDIDATES_MULTIPLIER = 32  # shortlist size per requested hit when re-scoring pq storage or ivf_pq
+STORAGE_TRAIN_MIN_VECTORS = 10_000  # sq8 / pq indexes hold float32 vectors until this many can train the encoder
@@ -1,5 +1,17 @@
-from typing import Dict, List
-from app.config import CHUNK_SIZE, CHUNK_OVERLAP
+from bisect import bisect_right
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+from app.config import (
+    CHUNK_OVERLAP,
+    CHUNK_OVERLAP_TOKENS,
+    CHUNK_SIZE,
+    CHUNK_TOKENS,
+    CHUNKING_MODE,
+    MAX_CONTEXT_TOKENS,
+    PROMPT_RESERVED_TOKENS,
+    TOKENIZE_PAGE_BATCH,
+    TOP_K,
+)
 from app.logger import get_logger
 
 logger = get_logger()
@@ -19,42 +31,250 @@ def normalize_text(text: str) -> str:
 
     return "\n".join(lines)
 
-def chunk_text(text: str) -> List[Dict]:
+
+def page_span(page_offsets: List[int], page_numbers: List[int], start: int, end: int) -> Tuple[int, int]:
     """
-    Split normalized text into overlapping chunks with metadata.
+    First and last page of the normalized text span start:end, given the
+    offset at which each buffered page starts.
+    """
+    first = bisect_right(page_offsets, start) - 1
+    last = bisect_right(page_offsets, max(start, end - 1)) - 1
 
-    Returns : 
-        List of chunks each containing:
-        - chunk_id, text, start_char_pos, end_char_pos
+    return page_numbers[first], page_numbers[last]
+
+
+def trim_pages(page_offsets: List[int], page_numbers: List[int], cut: int) -> None:
+    """
+    Forget pages that end before offset `cut`.
     """
+    drop = max(0, bisect_right(page_offsets, cut) - 1)
+    del page_offsets[:drop]
+    del page_numbers[:drop]
 
-    normalized_text = normalize_text(text)
-    text_length = len(normalized_text)
 
-    if text_length == 0:
-        raise ValueError("Cannot chunk empty text")
-    
-    logger.info(f"Starting chunking process | text length = {text_length}")
+def iter_chunks(pages: Iterable[Tuple[int, str]]) -> Iterator[Dict]:
+    """
+    Incrementally split streamed pages into overlapping chunks with metadata.
+    Pages are normalized one at a time and joined with "\n", so offsets match
+    chunking the normalized full text while only a small tail is kept in memory.
 
-    chunks : List[Dict] = []
+    Yields :
+        chunk dicts containing:
+        - chunk_id, text, start_char_pos, end_char_pos, page_start, page_end
+    """
+
+    step = CHUNK_SIZE - CHUNK_OVERLAP
+
+    buffer = ""  # normalized text from buffer_start onwards
+    buffer_start = 0
+    text_length = 0
     start = 0
     chunk_id = 0
 
-    while start < text_length:
-        end = start + CHUNK_SIZE
-        chunk_content = normalized_text[start:end]
+    # start offset and number of each page still in the buffer
+    page_offsets: List[int] = []
+    page_numbers: List[int] = []
+
+    def make_chunk(end: int) -> Dict:
+        page_start, page_end = page_span(page_offsets, page_numbers, start, end)
+        return {
+            "chunk_id": chunk_id,
+            "text" : buffer[start - buffer_start:end - buffer_start],
+            "start_char_pos": start,
+            "end_char_pos": end,
+            "page_start": page_start,
+            "page_end": page_end
+        }
 
-        if chunk_content.strip():
-            chunks.append({
-                "chunk_id": chunk_id,
-                "text" : chunk_content,
-                "start_char_pos": start,
-                "end_char_pos": min(end, text_length)
-            })
+    logger.info("Starting chunking process")
 
+    for page_number, page_text in pages:
+        normalized_page = normalize_text(page_text)
+        if not normalized_page:
+            continue
+
+        if text_length:
+            buffer += "\n"
+            text_length += 1
+
+        page_offsets.append(text_length)
+        page_numbers.append(page_number)
+        buffer += normalized_page
+        text_length += len(normalized_page)
+
+        # emit every chunk that is already complete
+        while start + CHUNK_SIZE <= text_length:
+            chunk = make_chunk(start + CHUNK_SIZE)
+            if chunk["text"].strip():
+                yield chunk
+                chunk_id += 1
+            start += step
+
+        buffer = buffer[start - buffer_start:]
+        buffer_start = start
+        trim_pages(page_offsets, page_numbers, start)
+
+    if text_length == 0:
+        raise ValueError("Cannot chunk empty text")
+
+    # flush the tail
+    while start < text_length:
+        chunk = make_chunk(text_length)
+        if chunk["text"].strip():
+            yield chunk
             chunk_id += 1
-            start += (CHUNK_SIZE - CHUNK_OVERLAP)
+        start += step
+
+    logger.info(
+        f"chunking completed | text length = {text_length} | total chunks = {chunk_id}"
+    )
+
+
+def chunk_token_size() -> Tuple[int, int]:
+    """
+    (chunk size, overlap) in LLM tokens for tokens mode, sized so that
+    TOP_K chunks fit in the context budget next to the instruction and question.
+    """
+    size = CHUNK_TOKENS or max(1, (MAX_CONTEXT_TOKENS - PROMPT_RESERVED_TOKENS) // TOP_K)
+    overlap = CHUNK_OVERLAP_TOKENS if CHUNK_OVERLAP_TOKENS is not None else size // 5
+
+    if not 0 <= overlap < size:
+        raise ValueError("Chunk token overlap must be smaller than the chunk size")
+
+    return size, overlap
+
+
+def iter_token_chunks(pages: Iterable[Tuple[int, str]], tokenizer) -> Iterator[Dict]:
+    """
+    Incrementally split streamed pages into overlapping chunks of a fixed
+    number of LLM tokens. Pages are normalized and tokenized in batches with
+    the fast tokenizer's offset mapping, so each chunk's text is exactly the
+    normalized span start_char_pos:end_char_pos (offsets match iter_chunks).
 
-    logger.info(f"chunking completed | total chunks = {len(chunks)}")
+    Yields :
+        chunk dicts containing:
+        - chunk_id, text, start_char_pos, end_char_pos, page_start, page_end
+    """
+
+    size, overlap = chunk_token_size()
+    step = size - overlap
+
+    buffer = ""  # normalized text from buffer_start onwards
+    buffer_start = 0
+    text_length = 0
+
+    # char spans of the buffered tokens; token_base is the index of the first one
+    starts: List[int] = []
+    ends: List[int] = []
+    token_base = 0
+    next_token = 0  # first token of the next chunk
+    chunk_id = 0
+
+    # start offset and number of each page still in the buffer
+    page_offsets: List[int] = []
+    page_numbers: List[int] = []
+
+    def make_chunk(first: int, last: int) -> Dict:
+        start = starts[first - token_base]
+        end = ends[last - 1 - token_base]
+        page_start, page_end = page_span(page_offsets, page_numbers, start, end)
+        return {
+            "chunk_id": chunk_id,
+            "text": buffer[start - buffer_start:end - buffer_start],
+            "start_char_pos": start,
+            "end_char_pos": end,
+            "page_start": page_start,
+            "page_end": page_end
+        }
+
+    logger.info(f"Starting token chunking process | chunk_tokens={size} | overlap_tokens={overlap}")
+
+    normalized_pages = (
+        (page_number, normalized)
+        for page_number, normalized in (
+            (page_number, normalize_text(page_text)) for page_number, page_text in pages
+        )
+        if normalized
+    )
+
+    while True:
+        page_batch = list(islice(normalized_pages, TOKENIZE_PAGE_BATCH))
+        if not page_batch:
+            break
+
+        encoded = tokenizer(
+            [page for _, page in page_batch],
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False
+        )
+
+        for (page_number, page), offsets in zip(page_batch, encoded["offset_mapping"]):
+            if text_length:
+                buffer += "\n"
+                text_length += 1
+
+            page_start = text_length
+            page_offsets.append(page_start)
+            page_numbers.append(page_number)
+            buffer += page
+            text_length += len(page)
+
+            for token_start, token_end in offsets:
+                # zero-width tokens (e.g. a bare word-boundary marker) carry no text
+                if token_end > token_start:
+                    starts.append(page_start + token_start)
+                    ends.append(page_start + token_end)
+
+            # emit every chunk that is already complete
+            while next_token + size <= token_base + len(starts):
+                yield make_chunk(next_token, next_token + size)
+                chunk_id += 1
+                next_token += step
+
+            del starts[:next_token - token_base]
+            del ends[:next_token - token_base]
+            token_base = next_token
+
+            cut = starts[0] if starts else text_length
+            buffer = buffer[cut - buffer_start:]
+            buffer_start = cut
+            trim_pages(page_offsets, page_numbers, cut)
+
+    if text_length == 0:
+        raise ValueError("Cannot chunk empty text")
+
+    # flush the tail unless the previous chunk's overlap already covers it
+    total_tokens = token_base + len(starts)
+    if next_token < total_tokens and (chunk_id == 0 or total_tokens > next_token + overlap):
+        yield make_chunk(next_token, total_tokens)
+        chunk_id += 1
+
+    logger.info(
+        f"chunking completed | text length = {text_length} | total chunks = {chunk_id}"
+    )
+
+
+def iter_document_chunks(pages: Iterable[Tuple[int, str]], tokenizer) -> Iterator[Dict]:
+    """
+    Chunk streamed pages with the configured CHUNKING_MODE.
+    """
+    if CHUNKING_MODE == "tokens":
+        return iter_token_chunks(pages, tokenizer)
+
+    if CHUNKING_MODE == "chars":
+        return iter_chunks(pages)
+
+    raise ValueError(f"Unsupported chunking mode: {CHUNKING_MODE}. Expected 'chars' or 'tokens'")
+
+
+def chunk_text(text: str) -> List[Dict]:
+    """
+    Split normalized text into overlapping chunks with metadata.
+
+    Returns : 
+        List of chunks each containing:
+        - chunk_id, text, start_char_pos, end_char_pos
+    """
 
-    return chunks
+    return list(iter_chunks([(1, text)]))
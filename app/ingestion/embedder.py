@@ -1,15 +1,62 @@
-from typing import List, Dict, Tuple
+from itertools import islice
+from typing import Callable, List, Dict, Iterable, Iterator, Optional, Tuple
+import hashlib
+import threading
+import time
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
-from app.config import EMBEDDING_MODEL
+from app.cache.lru import LRUCache
+from app.config import EMBEDDING_MODEL, EMBED_BATCH_SIZE, EMBED_DEDUP_CACHE_SIZE
 from app.logger import get_logger
+from app.utils.model_cache import bake_model, find_baked_model
 
 logger = get_logger()
 
-logger.info(f"Loading embedding model: {EMBEDDING_MODEL}")
+EMBEDDING_MODEL_KIND = "embedding"
+
+# loaded on first use (or by the startup warm-up), never at import time
+_embedding_model = None
+_load_lock = threading.Lock()
+
+
+def get_embedding_model() -> SentenceTransformer:
+    global _embedding_model
+
+    if _embedding_model is None:
+        with _load_lock:
+            if _embedding_model is None:
+                source = find_baked_model(EMBEDDING_MODEL_KIND, EMBEDDING_MODEL) or EMBEDDING_MODEL
+                logger.info(f"Loading embedding model: {EMBEDDING_MODEL} | source={source}")
+                _embedding_model = SentenceTransformer(source)
+
+    return _embedding_model
+
+
+def is_ready() -> bool:
+    return _embedding_model is not None
+
+
+def warm_up() -> None:
+    """
+    Load the embedding model and run one encode pass.
+    """
+    start = time.perf_counter()
+    get_embedding_model().encode(["warm up"], normalize_embeddings=True)
+
+    logger.info(f"Embedding warm-up completed | seconds={time.perf_counter() - start:.2f}")
+
+
+def bake_embedding_model() -> str:
+    """
+    Save the embedding model into the local model cache.
+    """
+    return bake_model(
+        EMBEDDING_MODEL_KIND,
+        EMBEDDING_MODEL,
+        lambda path: SentenceTransformer(EMBEDDING_MODEL).save(path)
+    )
 
-embedding_model = SentenceTransformer(EMBEDDING_MODEL)
 
 def embed_chunks(chunks: List[Dict]) -> Tuple[np.ndarray, List[Dict]]:
     """
@@ -30,25 +77,100 @@ def embed_chunks(chunks: List[Dict]) -> Tuple[np.ndarray, List[Dict]]:
 
     logger.info(f"Generating Embeddings | num_chunks={len(texts)}")
 
-    embeddings = embedding_model.encode(
+    embeddings = get_embedding_model().encode(
         texts,
         batch_size = 32,
         show_progress_bar=False,
         normalize_embeddings=True
     )
 
-    metadata = [
-        {
-            "chunk_id": chunk["chunk_id"],
-            "text": chunk["text"],  
-            "start_char_pos": chunk["start_char_pos"],
-            "end_char_pos": chunk["end_char_pos"]
-        }
-        for chunk in chunks
-    ]
+    # metadata carries every chunk field (text, offsets, document info)
+    metadata = [dict(chunk) for chunk in chunks]
 
     logger.info(f"Embeddings generated | shape={embeddings.shape}")
 
     return embeddings, metadata
 
 
+def content_hash(text: str) -> str:
+    """
+    Hash of a chunk's normalized text, the key for reusing its embedding.
+    """
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+
+class ChunkDeduplicator:
+    """
+    Embeds chunks, reusing the embedding of any chunk whose normalized text
+    was embedded before: first from the chunks of the current ingest (a
+    bounded LRU), then from the index via `find_embeddings`. Only the rest
+    go through the model.
+    """
+
+    def __init__(
+        self,
+        find_embeddings: Callable[[List[str]], Dict[str, np.ndarray]],
+        cache_size: int = EMBED_DEDUP_CACHE_SIZE
+    ):
+        self.find_embeddings = find_embeddings
+        self.recent = LRUCache(cache_size)
+
+        self.chunks_new = 0
+        self.chunks_deduplicated = 0
+
+    def embed(self, chunks: List[Dict]) -> Tuple[np.ndarray, List[Dict]]:
+        metadata = [dict(chunk, content_hash=content_hash(chunk["text"])) for chunk in chunks]
+        hashes = [item["content_hash"] for item in metadata]
+
+        known = {}
+        for key in set(hashes):
+            embedding = self.recent.get(key)
+            if embedding is not None:
+                known[key] = embedding
+
+        unknown = [key for key in set(hashes) if key not in known]
+        known.update(self.find_embeddings(unknown))
+
+        # identical chunks inside the batch are embedded once
+        to_embed = {}
+        for item in metadata:
+            if item["content_hash"] not in known:
+                to_embed.setdefault(item["content_hash"], item)
+
+        if to_embed:
+            new_embeddings, _ = embed_chunks(list(to_embed.values()))
+            known.update(zip(to_embed, new_embeddings.astype(np.float32, copy=False)))
+
+        for key in set(hashes):
+            self.recent.put(key, known[key])
+
+        self.chunks_new += len(to_embed)
+        self.chunks_deduplicated += len(metadata) - len(to_embed)
+
+        embeddings = np.vstack([known[key] for key in hashes])
+
+        return embeddings, metadata
+
+
+def iter_embedded_batches(
+    chunks: Iterable[Dict],
+    batch_size: int = EMBED_BATCH_SIZE,
+    deduplicator: Optional[ChunkDeduplicator] = None
+) -> Iterator[Tuple[np.ndarray, List[Dict]]]:
+    """
+    Embed a stream of chunks in fixed-size batches.
+    Only one batch of chunks and vectors is held in memory at a time.
+    With a deduplicator, previously embedded chunk texts are not re-encoded.
+    """
+
+    chunks = iter(chunks)
+
+    while True:
+        batch = list(islice(chunks, batch_size))
+        if not batch:
+            break
+
+        if deduplicator is not None:
+            yield deduplicator.embed(batch)
+        else:
+            yield embed_chunks(batch)
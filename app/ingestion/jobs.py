@@ -0,0 +1,164 @@
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+from app.config import INGEST_WORKERS, INGEST_MAX_PENDING_JOBS, INGEST_JOB_HISTORY
+from app.logger import get_logger
+
+logger = get_logger()
+
+ACTIVE_STATUSES = {"queued", "running"}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class IngestionJob:
+    """
+    Status record for a single background ingestion run.
+    Updated by the worker thread and read by the status endpoint.
+    """
+
+    def __init__(self, file_name: str):
+        self.job_id = uuid.uuid4().hex
+        self.file_name = file_name
+        self.status = "queued"
+        self.stage = "queued"
+        self.progress = 0.0
+        self.error: Optional[str] = None
+        self.result: Optional[Dict] = None
+        self.created_at = _now()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+
+        self._lock = threading.Lock()
+
+    def update(self, stage: Optional[str] = None, progress: Optional[float] = None) -> None:
+        """
+        Record the current pipeline stage and overall progress (0.0 - 1.0).
+        """
+        with self._lock:
+            if stage is not None:
+                self.stage = stage
+            if progress is not None:
+                self.progress = round(min(max(progress, 0.0), 1.0), 3)
+
+        logger.info(
+            f"Ingestion job progress | job_id={self.job_id} | stage={self.stage} | progress={self.progress}"
+        )
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "file_name": self.file_name,
+                "status": self.status,
+                "stage": self.stage,
+                "progress": self.progress,
+                "error": self.error,
+                "result": self.result,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class IngestionJobQueue:
+    """
+    Bounded worker pool that runs ingestion pipelines off the event loop.
+    Keeps a limited history of finished jobs for status polling.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = INGEST_WORKERS,
+        max_pending: int = INGEST_MAX_PENDING_JOBS,
+        history_size: int = INGEST_JOB_HISTORY
+    ):
+        self.max_pending = max_pending
+        self.history_size = history_size
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="ingest"
+        )
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        logger.info(
+            f"Initialized ingestion job queue | workers={max_workers} | max_pending={max_pending}"
+        )
+
+    def submit(self, file_name: str, pipeline: Callable[[IngestionJob], Dict]) -> IngestionJob:
+        """
+        Queue a pipeline for execution. The pipeline receives the job so it
+        can report progress and returns the result payload.
+        """
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job.status in ACTIVE_STATUSES)
+
+            if active >= self.max_pending:
+                raise RuntimeError("Too many ingestion jobs in progress, please retry later")
+
+            job = IngestionJob(file_name)
+            self._jobs[job.job_id] = job
+            self._prune()
+
+        self._executor.submit(self._run, job, pipeline)
+
+        logger.info(f"Ingestion job queued | job_id={job.job_id} | file={file_name}")
+
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: IngestionJob, pipeline: Callable[[IngestionJob], Dict]) -> None:
+        with job._lock:
+            job.status = "running"
+            job.started_at = _now()
+
+        try:
+            result = pipeline(job)
+
+            with job._lock:
+                job.status = "completed"
+                job.stage = "completed"
+                job.progress = 1.0
+                job.result = result
+
+            logger.info(f"Ingestion job completed | job_id={job.job_id}")
+
+        except Exception as e:
+            logger.exception(f"Ingestion job failed | job_id={job.job_id}")
+
+            with job._lock:
+                job.status = "failed"
+                job.error = str(e)
+
+        finally:
+            with job._lock:
+                job.finished_at = _now()
+
+    def _prune(self) -> None:
+        """
+        Drop the oldest finished jobs once the history limit is exceeded.
+        """
+        overflow = len(self._jobs) - self.history_size
+        if overflow <= 0:
+            return
+
+        for job_id in list(self._jobs):
+            if overflow <= 0:
+                break
+            if self._jobs[job_id].status not in ACTIVE_STATUSES:
+                del self._jobs[job_id]
+                overflow -= 1
@@ -1,141 +1,332 @@
 import os
-from typing import BinaryIO
+import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 import pdfplumber
 
-from app.config import STORAGE_DIR
 from app.logger import get_logger
+from app.utils.system_utils import available_cpus
 
-from pdf2image import convert_from_bytes
+from pdf2image import convert_from_path
 import pytesseract
-from app.config import MIN_TEXT_LENGTH
+from app.config import (
+    MAX_FILE_SIZE_MB,
+    MIN_PAGE_TEXT_LENGTH,
+    OCR_DPI,
+    PDF_PARALLEL_MIN_PAGES,
+    PDF_WORKERS,
+    TEXT_BLOCK_CHARS,
+)
 
 logger = get_logger()
 
 SUPPORTED_FILES = {".pdf", ".txt"}
-MAX_FILE_SIZE_MB = 10
 
 
-def validate_file(filename: str, file_size_bytes: int) -> None:
+def validate_extension(filename: str) -> str:
     extension = os.path.splitext(filename)[1].lower()
 
     if extension not in SUPPORTED_FILES:
         raise ValueError(f"Unsupported file type: {extension}. Please upload .pdf or .txt file!")
-    
+
+    return extension
+
+
+def validate_file(filename: str, file_size_bytes: int) -> None:
+    validate_extension(filename)
+
     max_size_bytes = MAX_FILE_SIZE_MB * 1024 * 1024
     if file_size_bytes > max_size_bytes:
         raise ValueError("File size exceeds allowed limit")
-    
+
     if file_size_bytes == 0:
         raise ValueError("Empty file uploaded")
-    
 
-def load_text_file(file: BinaryIO) -> str:
+
+def load_text_file(file_path: str) -> Iterator[Tuple[int, str]]:
+    """
+    Stream a UTF-8 text file as blocks of whole lines.
+    Blocks are split on line breaks so that joining them with "\\n"
+    reproduces the original text.
+    """
+    carry = ""
+    has_text = False
+
     try:
-        raw_text = file.read().decode("utf-8")
-    except Exception as e:
+        with open(file_path, "r", encoding="utf-8", newline="") as f:
+            while True:
+                block = f.read(TEXT_BLOCK_CHARS)
+                if not block:
+                    break
+
+                block = carry + block.replace("\x00", "")
+                split_at = block.rfind("\n")
+
+                if split_at == -1:
+                    carry = block
+                    continue
+
+                carry = block[split_at + 1:]
+                block = block[:split_at]
+
+                if block.strip():
+                    has_text = True
+                yield 1, block
+
+    except UnicodeDecodeError as e:
         logger.error("text file decode failed")
         raise ValueError("Unable to decode text file as UTF-8") from e
-    
-    text = raw_text.replace("\x00", "").strip()
 
-    if not text:
+    if carry.strip():
+        has_text = True
+        yield 1, carry
+
+    if not has_text:
         raise ValueError("Text file contains no readable text")
-    
-    return text
 
-def extract_text_from_pdf(file_path: str) -> str:
-    extracted_pages = []
 
-    with pdfplumber.open(file_path) as pdf:
-        logger.info(f"PDF opened with {len(pdf.pages)} pages")
+# Per-process state for PDF workers. Each worker opens the document once
+# and keeps it open for every page it is handed.
+_worker_pdf_path: Optional[str] = None
+_worker_pdf: Optional[pdfplumber.PDF] = None
 
-        for page_number, page in enumerate(pdf.pages, start=1):
-            page_text = page.extract_text()
-            if page_text:
-                extracted_pages.append(page_text)
 
-    text = "\n".join(extracted_pages).strip()
-    return text
+def _init_pdf_worker(file_path: str) -> None:
+    global _worker_pdf_path, _worker_pdf
+    _worker_pdf_path = file_path
+    _worker_pdf = None
 
 
-def ocr_pdf(file_bytes: bytes) -> str:
-    images = convert_from_bytes(file_bytes, dpi=300)
-    ocr_text = []
+def _page_pool(file_path: str, workers: int) -> ProcessPoolExecutor:
+    # spawn keeps the workers free of the parent's torch / tokenizer threads
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_pdf_worker,
+        initargs=(file_path,)
+    )
+
+
+def _map_pages_ordered(
+    executor: ProcessPoolExecutor,
+    fn: Callable,
+    page_numbers: Iterable[int],
+    window: int
+) -> Iterator:
+    """
+    Run fn over pages keeping at most `window` pages in flight,
+    yielding results in page order as soon as each one is ready.
+    """
+    pending = deque()
+    pages = iter(page_numbers)
+
+    for page_number in islice(pages, window):
+        pending.append(executor.submit(fn, page_number))
 
+    while pending:
+        result = pending.popleft().result()
+
+        next_page = next(pages, None)
+        if next_page is not None:
+            pending.append(executor.submit(fn, next_page))
+
+        yield result
+
+
+def _ocr_page_image(file_path: str, page_number: int) -> Tuple[str, float, float]:
+    """
+    Render and recognize a single page. Only one rendered page is alive at a time.
+    """
+    render_start = time.perf_counter()
+    images = convert_from_path(
+        file_path,
+        dpi=OCR_DPI,
+        first_page=page_number,
+        last_page=page_number,
+        grayscale=True
+    )
+    render_seconds = time.perf_counter() - render_start
+
+    ocr_start = time.perf_counter()
+    text = ""
     for img in images:
-        img = img.convert("L")  # grayscale
         text = pytesseract.image_to_string(
             img,
             lang="eng",
             config="--oem 3 --psm 6"
         )
-        if text:
-            ocr_text.append(text)
+        img.close()
+    ocr_seconds = time.perf_counter() - ocr_start
 
-    return "\n".join(ocr_text).strip()
+    return text, render_seconds, ocr_seconds
 
 
-def load_document(
-        file_name: str,
-        file: BinaryIO,
-        file_size_bytes: int
-) -> str:
+def _ocr_page(page_number: int) -> Tuple[int, str, float, float]:
+    text, render_seconds, ocr_seconds = _ocr_page_image(_worker_pdf_path, page_number)
+    return page_number, text, render_seconds, ocr_seconds
+
+
+def _load_page(page_number: int) -> Tuple[int, str, Optional[Tuple[float, float]]]:
     """
-    Validates and loads a document, returning extracted clean text.
+    Extract a page's text layer inside a PDF worker process,
+    OCRing it in place when the text layer is insufficient.
     """
+    global _worker_pdf
+
+    if _worker_pdf is None:
+        _worker_pdf = pdfplumber.open(_worker_pdf_path)
+
+    page = _worker_pdf.pages[page_number - 1]
+    text = page.extract_text() or ""
+    page.close()
+
+    if len(text.strip()) >= MIN_PAGE_TEXT_LENGTH:
+        return page_number, text, None
+
+    ocr_text, render_seconds, ocr_seconds = _ocr_page_image(_worker_pdf_path, page_number)
+    if len(ocr_text.strip()) > len(text.strip()):
+        text = ocr_text
+
+    return page_number, text, (render_seconds, ocr_seconds)
+
+
+def _log_ocr_page(page_number: int, text: str, render_seconds: float, ocr_seconds: float) -> None:
     logger.info(
-        f"Starting ingestion for file={file_name},"
-        f"size={file_size_bytes} bytes"
+        f"OCR page completed | page={page_number} | "
+        f"render_s={render_seconds:.2f} | ocr_s={ocr_seconds:.2f} | length={len(text)}"
     )
 
-    validate_file(file_name, file_size_bytes)
 
-    extension = os.path.splitext(file_name)[1].lower()
+def ocr_pages(file_path: str, page_numbers: Iterable[int]) -> Iterator[Tuple[int, str]]:
+    """
+    OCR the given 1-based pages on a process pool, yielding (page_number, text)
+    in page order as soon as each page is ready.
+    """
+    page_numbers = list(page_numbers)
+    if not page_numbers:
+        return
 
-    if extension == ".txt":
-        text = load_text_file(file)
-    
-    elif extension == ".pdf":
-        os.makedirs(STORAGE_DIR, exist_ok=True)
-        temp_path = os.path.join(STORAGE_DIR, file_name)
+    workers = min(PDF_WORKERS or available_cpus(), len(page_numbers))
 
-        file_bytes = file.read()
+    logger.info(f"Starting OCR | pages={len(page_numbers)} | workers={workers}")
 
-        with open(temp_path, "wb") as f:
-            f.write(file_bytes)
+    with _page_pool(file_path, workers) as executor:
+        for page_number, text, render_seconds, ocr_seconds in _map_pages_ordered(
+            executor, _ocr_page, page_numbers, workers * 2
+        ):
+            _log_ocr_page(page_number, text, render_seconds, ocr_seconds)
+            yield page_number, text
 
-        # PDF text extraction
-        text = extract_text_from_pdf(temp_path)
 
-        # Decide whether OCR is needed
-        if not text or len(text.strip()) < MIN_TEXT_LENGTH:
-            logger.warning(
-                "PDF text extraction insufficient, falling back to OCR"
-            )
+def count_pages(file_name: str, file_path: str) -> Optional[int]:
+    """
+    Number of pages in a PDF, or None for formats without pages.
+    """
+    if validate_extension(file_name) != ".pdf":
+        return None
 
-            ocr_text = ocr_pdf(file_bytes)
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
 
-            if not ocr_text:
-                os.remove(temp_path)
-                raise ValueError("OCR failed to extract text from PDF")
 
-            text = ocr_text
-            logger.info(
-                f"OCR successful | extracted_length={len(text)}"
+def load_pdf(file_path: str) -> Iterator[Tuple[int, str]]:
+    """
+    Stream (page_number, text) in page order, OCRing only the pages
+    without a usable text layer.
+    """
+    with pdfplumber.open(file_path) as pdf:
+        page_count = len(pdf.pages)
+        logger.info(f"PDF opened with {page_count} pages")
+
+        page_texts: List[str] = []
+        if page_count < PDF_PARALLEL_MIN_PAGES:
+            page_texts = [page.extract_text() or "" for page in pdf.pages]
+
+    if page_count < PDF_PARALLEL_MIN_PAGES:
+        # Decide per page whether OCR is needed
+        ocr_page_numbers = [
+            page_number
+            for page_number, text in enumerate(page_texts, start=1)
+            if len(text.strip()) < MIN_PAGE_TEXT_LENGTH
+        ]
+
+        if ocr_page_numbers:
+            logger.warning(
+                f"PDF text layer insufficient on {len(ocr_page_numbers)}/{page_count} pages, "
+                "falling back to OCR for those pages"
             )
+
+            for page_number, ocr_text in ocr_pages(file_path, ocr_page_numbers):
+                if len(ocr_text.strip()) > len(page_texts[page_number - 1].strip()):
+                    page_texts[page_number - 1] = ocr_text
         else:
-            logger.info(
-                f"PDF text extracted without OCR | length={len(text)}"
-            )
+            logger.info("PDF text extracted without OCR")
+
+        for page_number, text in enumerate(page_texts, start=1):
+            yield page_number, text
+
+        return
+
+    # Large documents: each worker extracts its page and OCRs it only if needed
+    workers = min(PDF_WORKERS or available_cpus(), page_count)
+    ocr_count = 0
+
+    logger.info(f"Loading PDF pages in parallel | pages={page_count} | workers={workers}")
+
+    with _page_pool(file_path, workers) as executor:
+        for page_number, text, ocr_timings in _map_pages_ordered(
+            executor, _load_page, range(1, page_count + 1), workers * 2
+        ):
+            if ocr_timings is not None:
+                ocr_count += 1
+                _log_ocr_page(page_number, text, *ocr_timings)
+
+            yield page_number, text
+
+    if ocr_count:
+        logger.warning(f"PDF text layer insufficient on {ocr_count}/{page_count} pages, OCR was used")
+    else:
+        logger.info("PDF text extracted without OCR")
+
 
-        os.remove(temp_path)
+def load_document(
+        file_name: str,
+        file_path: str,
+        file_size_bytes: int
+) -> Iterator[Tuple[int, str]]:
+    """
+    Validates a document and streams its extracted text as (page_number, text).
+    """
+    logger.info(
+        f"Starting ingestion for file={file_name},"
+        f"size={file_size_bytes} bytes"
+    )
+
+    validate_file(file_name, file_size_bytes)
+
+    extension = os.path.splitext(file_name)[1].lower()
+
+    if extension == ".txt":
+        pages = load_text_file(file_path)
+
+    elif extension == ".pdf":
+        pages = load_pdf(file_path)
 
     else:
         raise ValueError("Unsupported file format")
-    
+
+    text_length = 0
+    for page_number, text in pages:
+        text_length += len(text.strip())
+        yield page_number, text
+
+    if text_length == 0:
+        raise ValueError("No text could be extracted from the document")
+
     logger.info(
         f"Ingestion successful for file={file_name},"
-        f"text_length={len(text)} charcters"
+        f"text_length={text_length} charcters"
     )
-
-    return text
\ No newline at end of file
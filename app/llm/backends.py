@@ -0,0 +1,172 @@
+import torch
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+from app.config import LLM_NUM_THREADS
+from app.logger import get_logger
+from app.utils.model_cache import bake_model, find_baked_model
+from app.utils.system_utils import available_cpus
+
+logger = get_logger()
+
+LLM_BACKENDS = {"torch_fp32", "torch_int8", "onnx", "bnb4"}
+
+# baked artifact each backend loads from; the torch backends all start from fp32 weights
+BAKED_KINDS = {
+    "torch_fp32": "llm-torch",
+    "torch_int8": "llm-torch",
+    "bnb4": "llm-torch",
+    "onnx": "llm-onnx",
+}
+
+
+def num_threads() -> int:
+    return LLM_NUM_THREADS or available_cpus()
+
+
+def _set_torch_threads() -> None:
+    threads = num_threads()
+    torch.set_num_threads(threads)
+    logger.info(f"Torch intra-op threads set | threads={threads}")
+
+
+def load_torch_fp32(model_name: str):
+    """
+    Plain float32 weights; the portable CPU baseline.
+    """
+    _set_torch_threads()
+
+    return AutoModelForSeq2SeqLM.from_pretrained(model_name, torch_dtype=torch.float32)
+
+
+def load_torch_int8(model_name: str):
+    """
+    Dynamic int8 quantization of every Linear layer: weights are stored
+    as int8 and activations are quantized on the fly, roughly quartering
+    the weight memory and speeding up the matmuls on CPU.
+    """
+    _set_torch_threads()
+
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name, torch_dtype=torch.float32)
+    model.eval()
+
+    return torch.ao.quantization.quantize_dynamic(
+        model,
+        {torch.nn.Linear},
+        dtype=torch.qint8
+    )
+
+
+def _ort_model_class():
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise ImportError(
+            "The onnx LLM backend requires `optimum[onnxruntime]`"
+        ) from e
+
+    return ORTModelForSeq2SeqLM
+
+
+def load_onnx(model_name: str, exported: bool = False):
+    """
+    Encoder/decoder exported to ONNX and run with ONNX Runtime, reusing
+    past key/values between decoding steps. `exported` skips the export
+    when `model_name` is a directory of already exported ONNX files.
+    """
+    import onnxruntime
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.intra_op_num_threads = num_threads()
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+    return _ort_model_class().from_pretrained(
+        model_name,
+        export=not exported,
+        use_cache=True,
+        provider="CPUExecutionProvider",
+        session_options=session_options
+    )
+
+
+def load_bnb4(model_name: str):
+    """
+    4-bit bitsandbytes quantization. Needs a CUDA device.
+    """
+    from transformers import BitsAndBytesConfig
+
+    bnb_config = BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_compute_dtype=torch.float16,
+        bnb_4bit_use_double_quant=True
+    )
+
+    return AutoModelForSeq2SeqLM.from_pretrained(
+        model_name,
+        quantization_config=bnb_config,
+    )
+
+
+_LOADERS = {
+    "torch_fp32": load_torch_fp32,
+    "torch_int8": load_torch_int8,
+    "onnx": load_onnx,
+    "bnb4": load_bnb4,
+}
+
+
+def _check_backend(backend: str) -> None:
+    if backend not in LLM_BACKENDS:
+        raise ValueError(f"Unsupported LLM backend: {backend}. Expected one of {sorted(LLM_BACKENDS)}")
+
+
+def model_source(backend: str, model_name: str) -> str:
+    """
+    Baked local directory for the backend if there is one, else the hub model name.
+    """
+    _check_backend(backend)
+
+    return find_baked_model(BAKED_KINDS[backend], model_name) or model_name
+
+
+def load_tokenizer(backend: str, model_name: str):
+    return AutoTokenizer.from_pretrained(model_source(backend, model_name))
+
+
+def load_model(backend: str, model_name: str):
+    """
+    Load the LLM for the given backend, ready for inference. Every backend
+    exposes the Hugging Face `generate` API, so batching, streaming and the
+    scheduler work the same whichever one is configured.
+    """
+    source = model_source(backend, model_name)
+
+    logger.info(f"Loading LLM model: {model_name} | backend={backend} | source={source}")
+
+    if backend == "onnx":
+        model = load_onnx(source, exported=source != model_name)
+    else:
+        model = _LOADERS[backend](source)
+
+    if hasattr(model, "eval"):
+        model.eval()
+
+    return model
+
+
+def bake_llm(backend: str, model_name: str) -> str:
+    """
+    Save the artifacts `backend` loads from (fp32 weights, or the exported
+    ONNX graphs) plus the tokenizer into the local model cache.
+    """
+    _check_backend(backend)
+
+    def save(path: str) -> None:
+        if BAKED_KINDS[backend] == "llm-onnx":
+            model = _ort_model_class().from_pretrained(model_name, export=True, use_cache=True)
+        else:
+            model = AutoModelForSeq2SeqLM.from_pretrained(model_name, torch_dtype=torch.float32)
+
+        model.save_pretrained(path)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(path)
+
+    return bake_model(BAKED_KINDS[backend], model_name, save)
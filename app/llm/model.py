@@ -1,61 +1,235 @@
+from typing import Iterator, List
+import threading
+import time
+
 import torch
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, BitsAndBytesConfig
+from transformers import (
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
+)
 
-from app.config import LLM_MODEL, MAX_NEW_TOKENS, TEMPERATURE
+from app.config import LLM_BACKEND, LLM_MODEL, MAX_NEW_TOKENS, TEMPERATURE
 from app.logger import get_logger
+from app.llm.backends import load_model, load_tokenizer
+from app.llm.scheduler import InferenceScheduler
 
 logger = get_logger()
 
-logger.info(f"Loading LLM model: {LLM_MODEL}")
+# loaded on first use (or by the startup warm-up), never at import time
+_tokenizer = None
+_model = None
+_load_lock = threading.Lock()
+# set once a generation (warm-up or real) has completed
+_warmed_up = False
 
-bnb_config = BitsAndBytesConfig(
-    load_in_4bit=True,
-    bnb_4bit_compute_dtype=torch.float16,
-    bnb_4bit_use_double_quant=True
-)
 
-tokenizer = AutoTokenizer.from_pretrained(LLM_MODEL)
+def get_tokenizer():
+    global _tokenizer
 
-model = AutoModelForSeq2SeqLM.from_pretrained(
-    LLM_MODEL,
-    quantization_config=bnb_config,
-    # torch_dtype=torch.float32,
-)
+    if _tokenizer is None:
+        with _load_lock:
+            if _tokenizer is None:
+                _tokenizer = load_tokenizer(LLM_BACKEND, LLM_MODEL)
 
-model.eval()
+    return _tokenizer
 
-logger.info("Flan-T5 model loaded successfully")
 
+def get_model():
+    global _model
 
-def generate_answer(prompt: str) -> str:
+    if _model is None:
+        with _load_lock:
+            if _model is None:
+                _model = load_model(LLM_BACKEND, LLM_MODEL)
+                logger.info("Flan-T5 model loaded successfully")
+
+    return _model
+
+
+def is_ready() -> bool:
+    return _warmed_up
+
+
+def _mark_warm() -> None:
+    global _warmed_up
+    _warmed_up = True
+
+
+def generate_batch(prompts: List[str]) -> List[str]:
     """
-    Generate an answer from flan-t5 using a grounded prompt
+    Run one padded model.generate call over a batch of prompts.
+    Only the inference scheduler thread should call this.
     """
+    tokenizer = get_tokenizer()
 
-    if not prompt or not prompt.strip():
-        raise ValueError("Prompt cannot be empty")
-    
     logger.info(
-        f"Starting LLM inference | prompt_length={len(prompt)}"
+        f"Starting LLM inference | prompts={len(prompts)} | "
+        f"prompt_length={sum(len(p) for p in prompts)}"
     )
 
     inputs = tokenizer(
-        prompt,
+        prompts,
         return_tensors="pt",
+        padding=True,
     )
 
     with torch.no_grad():
-        output = model.generate(
+        output = get_model().generate(
             **inputs,
             max_new_tokens = MAX_NEW_TOKENS,
             temperature = TEMPERATURE,
             do_sample = False,
             pad_token_id = tokenizer.eos_token_id
         )
-    
-    answer = tokenizer.decode(output[0], skip_special_tokens=True).strip()
 
+    answers = [
+        tokenizer.decode(sequence, skip_special_tokens=True).strip()
+        for sequence in output
+    ]
+    _mark_warm()
+
+    logger.info(
+        f"LLM inference completed | answers={len(answers)} | "
+        f"answer length={sum(len(a) for a in answers)}"
+    )
+
+    return answers
+
+
+class CancelledCriteria(StoppingCriteria):
+    """
+    Stops generation once the consumer of a stream has gone away.
+    """
+
+    def __init__(self, cancelled: threading.Event):
+        self.cancelled = cancelled
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full(
+            (input_ids.shape[0],),
+            self.cancelled.is_set(),
+            dtype=torch.bool,
+            device=input_ids.device
+        )
+
+
+def generate_streaming(
+    prompt: str,
+    streamer: TextIteratorStreamer,
+    cancelled: threading.Event
+) -> None:
+    """
+    Generate for a single prompt, pushing decoded text into `streamer` as
+    tokens are produced. Runs on the inference scheduler thread.
+    """
+
+    logger.info(f"Starting streaming LLM inference | prompt_length={len(prompt)}")
+
+    tokenizer = get_tokenizer()
+    inputs = tokenizer(prompt, return_tensors="pt")
+
+    try:
+        with torch.no_grad():
+            get_model().generate(
+                **inputs,
+                max_new_tokens = MAX_NEW_TOKENS,
+                temperature = TEMPERATURE,
+                do_sample = False,
+                pad_token_id = tokenizer.eos_token_id,
+                streamer = streamer,
+                stopping_criteria = StoppingCriteriaList([CancelledCriteria(cancelled)])
+            )
+    except Exception:
+        # unblock the consumer; the error is re-raised through the future
+        streamer.end()
+        raise
+
+    _mark_warm()
+
+    logger.info(f"Streaming LLM inference completed | cancelled={cancelled.is_set()}")
+
+
+# every generation goes through one scheduler thread that micro-batches prompts
+scheduler = InferenceScheduler(generate_batch)
+
+
+def warm_up() -> None:
+    """
+    Load the tokenizer and model and run one short generation on the
+    scheduler thread, so the first real request pays no one-off costs.
+    """
+    tokenizer = get_tokenizer()
+    model = get_model()
+
+    def run() -> None:
+        inputs = tokenizer(["Answer the question: what is this?"], return_tensors="pt")
+        with torch.no_grad():
+            model.generate(**inputs, max_new_tokens=4, do_sample=False)
+        _mark_warm()
+
+    start = time.perf_counter()
+    scheduler.submit_call(run).result()
+
+    logger.info(f"LLM warm-up completed | seconds={time.perf_counter() - start:.2f}")
+
+
+def generate_answer(prompt: str) -> str:
+    """
+    Generate an answer from flan-t5 using a grounded prompt
+    """
+
+    if not prompt or not prompt.strip():
+        raise ValueError("Prompt cannot be empty")
+
+    return scheduler.generate(prompt)
+
+
+def generate_answers(prompts: List[str]) -> List[str]:
+    """
+    Generate answers for many prompts; they are micro-batched together with
+    any concurrent requests. Answers keep input order.
+    """
+
+    if any(not prompt or not prompt.strip() for prompt in prompts):
+        raise ValueError("Prompt cannot be empty")
+
+    # similar lengths share a batch, which keeps padding low
+    order = sorted(range(len(prompts)), key=lambda i: len(prompts[i]))
+    sorted_answers = scheduler.generate_many([prompts[i] for i in order])
+
+    answers: List[str] = [""] * len(prompts)
+    for i, answer in zip(order, sorted_answers):
+        answers[i] = answer
+
+    return answers
+
+
+def stream_answer(prompt: str) -> Iterator[str]:
+    """
+    Generate an answer token by token. Text pieces are yielded as soon as
+    the model decodes them; closing the iterator stops generation.
+    """
+
+    if not prompt or not prompt.strip():
+        raise ValueError("Prompt cannot be empty")
+
+    return _iter_stream(prompt)
+
+
+def _iter_stream(prompt: str) -> Iterator[str]:
+    streamer = TextIteratorStreamer(get_tokenizer(), skip_prompt=True, skip_special_tokens=True)
+    cancelled = threading.Event()
+
+    future = scheduler.submit_call(lambda: generate_streaming(prompt, streamer, cancelled))
 
-    logger.info(f"LLM inference completed | answer length={len(answer)}")
+    try:
+        for text in streamer:
+            if text:
+                yield text
+    finally:
+        # no-op once generation has finished; otherwise the client went away
+        cancelled.set()
+        future.cancel()
 
-    return answer
\ No newline at end of file
+    future.result()
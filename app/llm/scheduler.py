@@ -0,0 +1,171 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from app.config import GENERATION_BATCH_SIZE, GENERATION_BATCH_WAIT_MS
+from app.logger import get_logger
+
+logger = get_logger()
+
+
+class InferenceScheduler:
+    """
+    Dynamic micro-batching in front of the LLM.
+
+    Callers enqueue prompts and block on a future. A single worker thread
+    owns the model: it takes the first waiting prompt, keeps collecting
+    more for up to `max_wait_ms` or until `max_batch_size` is reached,
+    runs one padded generate call for the batch and hands each answer back
+    to its caller. Concurrent requests therefore share generate calls
+    instead of competing for CPU from many threads.
+
+    Work that cannot be batched (streaming generation) is queued as a
+    callable and runs alone on the same thread, so the model still has a
+    single owner.
+    """
+
+    def __init__(
+        self,
+        generate_batch: Callable[[List[str]], List[str]],
+        max_batch_size: int = GENERATION_BATCH_SIZE,
+        max_wait_ms: float = GENERATION_BATCH_WAIT_MS
+    ):
+        self._generate_batch = generate_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+
+        # items are (prompt, future) or (callable, future)
+        self._queue: "queue.Queue[Optional[Tuple[Any, Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        # an exclusive call that ended batch collection; only touched by the worker
+        self._deferred: Optional[Tuple[Any, Future]] = None
+
+    def submit(self, prompt: str) -> Future:
+        """
+        Queue a prompt for generation and return a future for its answer.
+        """
+        self._ensure_started()
+
+        future: Future = Future()
+        self._queue.put((prompt, future))
+        return future
+
+    def submit_call(self, fn: Callable[[], Any]) -> Future:
+        """
+        Run `fn` on the scheduler thread by itself, between batches.
+        """
+        self._ensure_started()
+
+        future: Future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    def generate(self, prompt: str) -> str:
+        return self.submit(prompt).result()
+
+    def generate_many(self, prompts: List[str]) -> List[str]:
+        """
+        Queue several prompts at once; answers are returned in input order.
+        """
+        futures = [self.submit(prompt) for prompt in prompts]
+        return [future.result() for future in futures]
+
+    def shutdown(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _ensure_started(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="llm-scheduler",
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _collect_batch(self, first: Tuple[str, Future]) -> List[Tuple[str, Future]]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_seconds
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    # window closed: still take anything already waiting
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is None:
+                # re-queue the shutdown marker for the run loop
+                self._queue.put(None)
+                break
+
+            if callable(item[0]):
+                # exclusive calls run on their own, right after this batch
+                self._deferred = item
+                break
+
+            batch.append(item)
+
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            if self._deferred is not None:
+                first, self._deferred = self._deferred, None
+            else:
+                first = self._queue.get()
+
+            if first is None:
+                break
+
+            if callable(first[0]):
+                self._run_call(*first)
+                continue
+
+            batch = [
+                (prompt, future)
+                for prompt, future in self._collect_batch(first)
+                if future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+
+            try:
+                answers = self._generate_batch([prompt for prompt, _ in batch])
+
+                for (_, future), answer in zip(batch, answers):
+                    future.set_result(answer)
+
+            except Exception as e:
+                logger.exception("Batched LLM inference failed")
+                for _, future in batch:
+                    future.set_exception(e)
+
+            logger.info(
+                f"Scheduler batch completed | batch_size={len(batch)} | "
+                f"queued={self._queue.qsize()} | seconds={time.perf_counter() - start:.2f}"
+            )
+
+    def _run_call(self, fn: Callable[[], Any], future: Future) -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            logger.exception("Exclusive LLM call failed")
+            future.set_exception(e)
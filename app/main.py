@@ -1,7 +1,11 @@
+import json
+import time
+
 import requests
 import streamlit as st
 
 API_BASE_URL = "http://localhost:8000"
+INGEST_POLL_INTERVAL_SECONDS = 1
 
 st.set_page_config(
     page_title="Ask the Docs",
@@ -37,9 +41,33 @@ if uploaded_file is not None:
                 timeout=300
             )
 
-            if response.status_code == 200:
-                st.success("Document ingested successfully")
-                st.json(response.json())
+            if response.status_code == 202:
+                job_id = response.json()["job_id"]
+                progress_bar = st.progress(0.0, text="Queued")
+
+                # ingestion runs in the background; poll until it finishes
+                while True:
+                    status = requests.get(
+                        f"{API_BASE_URL}/ingest/{job_id}",
+                        timeout=30
+                    ).json()
+
+                    progress_bar.progress(
+                        status["progress"],
+                        text=status["stage"].capitalize()
+                    )
+
+                    if status["status"] in ("completed", "failed"):
+                        break
+
+                    time.sleep(INGEST_POLL_INTERVAL_SECONDS)
+
+                if status["status"] == "completed":
+                    st.success("Document ingested successfully")
+                    st.json(status["result"])
+                else:
+                    st.error("Failed to ingest document")
+                    st.write(status["error"])
             else:
                 st.error("Failed to ingest document")
                 st.write(response.json())
@@ -64,31 +92,60 @@ top_k = st.slider(
     value=4
 )
 
+def stream_answer_tokens(response):
+    """
+    Parse the /query/stream server-sent events, yielding answer text as it arrives.
+    """
+    event = None
+
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data = json.loads(line[len("data:"):])
+
+            if event == "chunks":
+                st.session_state["retrieved_chunks"] = data["chunks"]
+            elif event == "token":
+                yield data["text"]
+            elif event == "error":
+                raise RuntimeError(data["detail"])
+
+
 if st.button("Get Answer"):
     if not question.strip():
         st.warning("Please enter a question")
     else:
-        with st.spinner("Retrieving answer..."):
-            payload = {
-                "question": question,
-                "top_k": top_k
-            }
-
-            try:
-                response = requests.post(
-                    f"{API_BASE_URL}/query",
-                    json=payload,
-                    timeout=300
-                )
-
-                if response.status_code == 200:
-                    answer = response.json()["answer"]
-                    st.subheader("Answer")
-                    st.write(answer)
-                else:
-                    st.error("Failed to get answer")
-                    st.write(response.json())
+        payload = {
+            "question": question,
+            "top_k": top_k
+        }
 
-            except requests.exceptions.RequestException as e:
-                st.error("Backend service is not reachable")
-                st.write(str(e))
\ No newline at end of file
+        try:
+            response = requests.post(
+                f"{API_BASE_URL}/query/stream",
+                json=payload,
+                stream=True,
+                timeout=300
+            )
+
+            if response.status_code == 200:
+                st.subheader("Answer")
+                # tokens are rendered as they are generated
+                st.write_stream(stream_answer_tokens(response))
+
+                chunks = st.session_state.get("retrieved_chunks", [])
+                if chunks:
+                    with st.expander("Retrieved chunks"):
+                        st.json(chunks)
+            else:
+                st.error("Failed to get answer")
+                st.write(response.json())
+
+        except requests.exceptions.RequestException as e:
+            st.error("Backend service is not reachable")
+            st.write(str(e))
+
+        except RuntimeError as e:
+            st.error("Failed to get answer")
+            st.write(str(e))
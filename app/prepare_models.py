@@ -0,0 +1,38 @@
+"""
+Bake pre-converted model artifacts into MODEL_CACHE_DIR so containers load
+them from local disk instead of resolving and re-parsing hub checkpoints
+(and, for the onnx backend, re-exporting the graphs) on every cold start.
+
+Usage:
+    python -m app.prepare_models                        # configured LLM_BACKEND
+    python -m app.prepare_models --backends torch_fp32 onnx
+"""
+import argparse
+
+from app.config import LLM_BACKEND, LLM_MODEL, MODEL_CACHE_DIR
+from app.ingestion.embedder import bake_embedding_model
+from app.llm.backends import BAKED_KINDS, bake_llm
+from app.logger import get_logger
+
+logger = get_logger()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=[LLM_BACKEND], choices=sorted(BAKED_KINDS))
+    args = parser.parse_args()
+
+    logger.info(f"Baking models | cache_dir={MODEL_CACHE_DIR} | backends={args.backends}")
+
+    bake_embedding_model()
+
+    # backends that load from the same artifact are baked once
+    baked = set()
+    for backend in args.backends:
+        if BAKED_KINDS[backend] not in baked:
+            bake_llm(backend, LLM_MODEL)
+            baked.add(BAKED_KINDS[backend])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+from typing import Dict, List
+import numpy as np
+
+from app.ingestion.embedder import get_embedding_model
+from app.logger import get_logger
+from app.retrieval.extractive import split_sentences
+from app.retrieval.prompt import context_token_budget
+from app.utils.tokenizer_utils import count_tokens_batch
+
+logger = get_logger()
+
+
+def compress_context(
+    questions: List[str],
+    query_embeddings: np.ndarray,
+    retrieved: List[List[Dict]],
+    tokenizer
+) -> List[List[Dict]]:
+    """
+    Shrink each query's retrieved chunks to the sentences closest to its
+    question that fit the prompt's context token budget, so the encoder
+    skips irrelevant sentences and more chunks contribute evidence.
+    Sentences of all queries are embedded in one call. Kept sentences stay
+    in document order within their chunk; chunks keep their retrieval
+    order. Queries whose chunks already fit are returned unchanged. Every
+    returned chunk carries its token count, so the prompt builder does not
+    tokenize it again.
+    """
+    budgets = [context_token_budget(question, tokenizer) for question in questions]
+
+    # merged spans lost their stored counts; they are counted once and kept
+    uncounted = [chunk["text"].strip() for chunks in retrieved for chunk in chunks if chunk.get("token_count") is None]
+    counts = iter(count_tokens_batch(uncounted, tokenizer))
+    retrieved = [
+        [chunk if chunk.get("token_count") is not None else {**chunk, "token_count": next(counts)} for chunk in chunks]
+        for chunks in retrieved
+    ]
+    context_tokens = [sum(chunk["token_count"] for chunk in chunks) for chunks in retrieved]
+
+    over_budget = [i for i, budget in enumerate(budgets) if context_tokens[i] > budget]
+    if not over_budget:
+        return retrieved
+
+    # (chunk position, sentence text) of every sentence, in document order per chunk
+    sentences = {
+        i: [
+            (position, chunk["text"][start:end])
+            for position, chunk in enumerate(retrieved[i])
+            for start, end in split_sentences(chunk["text"], min_chars=1)
+        ]
+        for i in over_budget
+    }
+
+    texts = list(dict.fromkeys(text for i in over_budget for _, text in sentences[i]))
+    embeddings = get_embedding_model().encode(texts, normalize_embeddings=True)
+    token_counts = dict(zip(texts, count_tokens_batch(texts, tokenizer)))
+    rows = {text: row for row, text in enumerate(texts)}
+
+    compressed = list(retrieved)
+    for i in over_budget:
+        candidates = sentences[i]
+        scores = embeddings[[rows[text] for _, text in candidates]] @ query_embeddings[i]
+
+        # best sentences first; ones that do not fit are skipped so smaller ones can still go in
+        kept = []
+        seen = set()
+        used = 0
+        for j in np.argsort(-scores, kind="stable"):
+            text = candidates[j][1]
+            if text in seen or used + token_counts[text] > budgets[i]:
+                continue
+
+            kept.append(j)
+            seen.add(text)
+            used += token_counts[text]
+
+        by_chunk: Dict[int, List[str]] = {}
+        for j in sorted(kept):
+            position, text = candidates[j]
+            by_chunk.setdefault(position, []).append(text)
+
+        compressed[i] = [
+            {**retrieved[i][position], "text": " ".join(texts_kept)}
+            for position, texts_kept in by_chunk.items()
+        ]
+
+        logger.info(
+            f"Context compressed | tokens={context_tokens[i]}->{used} | "
+            f"sentences={len(kept)}/{len(candidates)} | chunks={len(compressed[i])}/{len(retrieved[i])}"
+        )
+
+    # joined sentences can tokenize differently than apart, so spans are counted as sent
+    spans = [chunk for i in over_budget for chunk in compressed[i]]
+    for chunk, count in zip(spans, count_tokens_batch([chunk["text"].strip() for chunk in spans], tokenizer)):
+        chunk["token_count"] = count
+
+    return compressed
@@ -0,0 +1,117 @@
+from typing import Dict, List, Optional, Tuple
+import re
+import numpy as np
+
+from app.config import EXTRACTIVE_INTENTS, EXTRACTIVE_MIN_SCORE, EXTRACTIVE_MIN_SENTENCE_CHARS
+from app.ingestion.embedder import get_embedding_model
+from app.logger import get_logger
+
+logger = get_logger()
+
+# chunks are whitespace-normalized, so sentences end at terminal punctuation or a line break
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# intents whose answers read as a list of points rather than one passage
+LIST_INTENTS = {"extractive"}
+
+
+def split_sentences(text: str, min_chars: int = EXTRACTIVE_MIN_SENTENCE_CHARS) -> List[Tuple[int, int]]:
+    """
+    (start, end) char offsets of the sentences in `text` with at least
+    `min_chars` characters.
+    """
+    spans = []
+    start = 0
+
+    for match in SENTENCE_BOUNDARY.finditer(text):
+        spans.append((start, match.start()))
+        start = match.end()
+    spans.append((start, len(text)))
+
+    sentences = []
+    for start, end in spans:
+        stripped = text[start:end].strip()
+        if not stripped or len(stripped) < min_chars:
+            continue
+
+        start += len(text[start:end]) - len(text[start:end].lstrip())
+        sentences.append((start, start + len(stripped)))
+
+    return sentences
+
+
+def serves_extractively(intent: str) -> bool:
+    return EXTRACTIVE_INTENTS.get(intent, 0) > 0
+
+
+def extract_answer(intent: str, query_embedding: np.ndarray, retrieved_chunks: List[Dict]) -> Optional[Dict]:
+    """
+    Answer from the best matching sentences of the retrieved chunks, or
+    None when the intent is generated or no sentence is close enough.
+    """
+    return extract_answers([intent], query_embedding[None, :], [retrieved_chunks])[0]
+
+
+def extract_answers(
+    intents: List[str],
+    query_embeddings: np.ndarray,
+    retrieved: List[List[Dict]]
+) -> List[Optional[Dict]]:
+    """
+    Score the sentences of each query's retrieved chunks against its
+    question embedding (one encode call for all queries) and return the
+    top EXTRACTIVE_INTENTS[intent] of them with their source offsets.
+    Entries are None where the LLM has to answer.
+    """
+    candidates: List[List[Dict]] = []
+    for intent, chunks in zip(intents, retrieved):
+        sentences = {}
+
+        if serves_extractively(intent):
+            for chunk in chunks:
+                for start, end in split_sentences(chunk["text"]):
+                    text = chunk["text"][start:end]
+                    # overlapping chunks repeat sentences; the first (best ranked) one is kept
+                    sentences.setdefault(text, {
+                        "text": text,
+                        "doc_id": chunk.get("doc_id"),
+                        "file_name": chunk.get("file_name"),
+                        "page_start": chunk.get("page_start"),
+                        "page_end": chunk.get("page_end"),
+                        "start_char_pos": chunk["start_char_pos"] + start,
+                        "end_char_pos": chunk["start_char_pos"] + end,
+                    })
+
+        candidates.append(list(sentences.values()))
+
+    texts = list(dict.fromkeys(sentence["text"] for sentences in candidates for sentence in sentences))
+    if not texts:
+        return [None] * len(intents)
+
+    embeddings = get_embedding_model().encode(texts, normalize_embeddings=True)
+    rows = {text: row for row, text in enumerate(texts)}
+
+    answers = []
+    for intent, query_embedding, sentences in zip(intents, query_embeddings, candidates):
+        if not sentences:
+            answers.append(None)
+            continue
+
+        scores = embeddings[[rows[sentence["text"]] for sentence in sentences]] @ query_embedding
+        order = np.argsort(-scores, kind="stable")[:EXTRACTIVE_INTENTS[intent]]
+
+        if scores[order[0]] < EXTRACTIVE_MIN_SCORE:
+            logger.info(f"Extractive answer below threshold | intent={intent} | best={scores[order[0]]:.3f}")
+            answers.append(None)
+            continue
+
+        sources = [{**sentences[i], "score": float(scores[i])} for i in order]
+
+        if intent in LIST_INTENTS:
+            answer = "\n".join(f"- {source['text']}" for source in sources)
+        else:
+            answer = " ".join(source["text"] for source in sources)
+
+        answers.append({"answer": answer, "sources": sources})
+
+    return answers
@@ -1,3 +1,5 @@
+from typing import Dict
+
 from app.config import MAX_CONTEXT_TOKENS
 from app.utils.tokenizer_utils import count_tokens
 from app.retrieval.intent import detect_intent
@@ -5,6 +7,48 @@ from app.logger import get_logger
 
 logger = get_logger()
 
+# Instruction templates
+INSTRUCTIONS = {
+    "summarization": (
+        "Summarize the document using ONLY the information in the context below.\n"
+        "You may combine and rephrase points from the context, but do not add "
+        "any external knowledge or assumptions.\n\n"
+    ),
+    "definition": (
+        "Answer the question using ONLY the information present in the context.\n"
+        "You may rephrase or combine sentences from the context, but do not add "
+        "external information.\n\n"
+    ),
+    "extractive": (
+        "List the main topics explicitly mentioned in the context below.\n"
+        "Do not infer or add new topics.\n\n"
+    ),
+    # factual QA
+    "qa": (
+        "Answer the question using ONLY the context below.\n"
+        "If the answer cannot be answered from the context, say \"I don't know\".\n\n"
+    ),
+}
+
+# token count of each instruction template, computed on first use
+_instruction_tokens: Dict[str, int] = {}
+
+
+def instruction_token_count(intent: str, tokenizer) -> int:
+    if intent not in _instruction_tokens:
+        _instruction_tokens[intent] = count_tokens(INSTRUCTIONS[intent], tokenizer)
+
+    return _instruction_tokens[intent]
+
+
+def context_token_budget(question: str, tokenizer) -> int:
+    """
+    Tokens left for context once the instruction and question are counted.
+    """
+    intent = detect_intent(question)
+
+    return MAX_CONTEXT_TOKENS - instruction_token_count(intent, tokenizer) - count_tokens(question, tokenizer)
+
 
 def build_prompt(
     question: str,
@@ -16,48 +60,24 @@ def build_prompt(
     """
 
     intent = detect_intent(question)
+    instruction = INSTRUCTIONS[intent]
+
+    # Context packing: chunk token counts were computed at ingest
 
-    # Instruction templates
-    if intent == "summarization":
-        instruction = (
-            "Summarize the document using ONLY the information in the context below.\n"
-            "You may combine and rephrase points from the context, but do not add "
-            "any external knowledge or assumptions.\n\n"
-        )
-
-    elif intent == "definition":
-        instruction = (
-            "Answer the question using ONLY the information present in the context.\n"
-            "You may rephrase or combine sentences from the context, but do not add "
-            "external information.\n\n"
-        )
-
-    elif intent == "extractive":
-        instruction = (
-            "List the main topics explicitly mentioned in the context below.\n"
-            "Do not infer or add new topics.\n\n"
-        )
-
-    else:  # factual QA
-        instruction = (
-            "Answer the question using ONLY the context below.\n"
-            "If the answer cannot be answered from the context, say \"I don't know\".\n\n"
-        )
-
-    # Context packing 
-
-    used_tokens = count_tokens(instruction + question, tokenizer)
+    used_tokens = instruction_token_count(intent, tokenizer) + count_tokens(question, tokenizer)
     context_blocks = []
 
     for chunk in retrieved_chunks:
-        text = chunk["text"].strip()
-        token_count = count_tokens(text, tokenizer)
+        token_count = chunk.get("token_count")
+        if token_count is None:
+            # merged spans, and chunks indexed before token counts were stored
+            token_count = count_tokens(chunk["text"].strip(), tokenizer)
 
         if used_tokens + token_count > MAX_CONTEXT_TOKENS:
             logger.info("Context token budget reached; stopping chunk addition")
             break
 
-        context_blocks.append(text)
+        context_blocks.append(chunk["text"].strip())
         used_tokens += token_count
 
     context = "\n\n".join(context_blocks)
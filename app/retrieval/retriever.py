@@ -1,43 +1,272 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import numpy as np
 
-from app.config import TOP_K
+from app.config import (
+    HYBRID_SEARCH,
+    MERGE_OVERLAPPING_HITS,
+    MMR_LAMBDA,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    RETRIEVAL_CANDIDATES_MULTIPLIER,
+    TOP_K,
+)
+from app.cache.lru import LRUCache
 from app.logger import get_logger
 from app.vectorstore.faiss_store import FaissVectorStore
-from app.ingestion.embedder import embedding_model
+from app.ingestion.embedder import get_embedding_model
 
 logger = get_logger()
 
+# normalized question -> float32 embedding, shared by single and batch retrieval
+query_embedding_cache: Optional[LRUCache] = (
+    LRUCache(QUERY_EMBEDDING_CACHE_SIZE) if QUERY_EMBEDDING_CACHE_SIZE else None
+)
+
+
+def query_cache_key(query: str) -> str:
+    # whitespace never changes the embedding; case does, so it is kept
+    return " ".join(query.split())
+
+
+def embed_queries(queries: List[str]) -> np.ndarray:
+    """
+    Embed queries in one batched call (same embedding space as documents).
+    Repeated questions are served from the query embedding cache; only
+    the misses go through the model.
+    """
+    keys = [query_cache_key(query) for query in queries]
+
+    cached = {}
+    if query_embedding_cache is not None:
+        for key in set(keys):
+            embedding = query_embedding_cache.get(key)
+            if embedding is not None:
+                cached[key] = embedding
+
+    missing = [key for key in dict.fromkeys(keys) if key not in cached]
+
+    if missing:
+        new_embeddings = get_embedding_model().encode(
+            missing,
+            normalize_embeddings=True
+        )
+
+        if new_embeddings.dtype != np.float32:
+            new_embeddings = new_embeddings.astype(np.float32)
+
+        for key, embedding in zip(missing, new_embeddings):
+            embedding.flags.writeable = False
+            cached[key] = embedding
+            if query_embedding_cache is not None:
+                query_embedding_cache.put(key, embedding)
+
+    return np.vstack([cached[key] for key in keys])
+
+
+def merge_overlapping_hits(hits: List[Dict]) -> List[Dict]:
+    """
+    Join hits from the same document whose char spans overlap or touch into
+    one span, so shared chunk overlap is not sent to the model twice.
+    Merged spans keep the best member score and list their chunk and vector
+    ids; results are ordered by score.
+    """
+
+    by_doc: Dict[str, List[Dict]] = {}
+    for hit in hits:
+        by_doc.setdefault(hit.get("doc_id"), []).append(hit)
+
+    spans = []
+    for doc_hits in by_doc.values():
+        doc_hits.sort(key=lambda hit: hit["start_char_pos"])
+
+        current = None
+        for hit in doc_hits:
+            if current is not None and hit["start_char_pos"] <= current["end_char_pos"]:
+                if hit["end_char_pos"] > current["end_char_pos"]:
+                    overlap = current["end_char_pos"] - hit["start_char_pos"]
+                    current["text"] += hit["text"][overlap:]
+                    current["end_char_pos"] = hit["end_char_pos"]
+                    current["page_end"] = hit.get("page_end")
+
+                current["chunk_ids"].append(hit.get("chunk_id"))
+                current["vector_ids"].append(hit["vector_id"])
+                current["score"] = max(current["score"], hit["score"])
+                # the merged text has to be counted again when the prompt is built
+                current["token_count"] = None
+                continue
+
+            current = {
+                **hit,
+                "chunk_ids": [hit.get("chunk_id")],
+                "vector_ids": [hit["vector_id"]],
+            }
+            spans.append(current)
+
+    spans.sort(key=lambda span: span["score"], reverse=True)
+
+    return spans
+
+
+def mmr_select(
+    query_embedding: np.ndarray,
+    candidate_embeddings: np.ndarray,
+    top_k: int,
+    lambda_mult: float = MMR_LAMBDA,
+    relevance: Optional[np.ndarray] = None
+) -> List[int]:
+    """
+    Maximal marginal relevance: greedily pick candidates that are relevant to
+    the query but dissimilar to those already picked. Relevance defaults to
+    cosine similarity with the query. Returns candidate indices.
+    """
+
+    if relevance is None:
+        relevance = candidate_embeddings @ query_embedding
+    similarity = candidate_embeddings @ candidate_embeddings.T
+
+    # highest similarity of each candidate to anything already selected
+    redundancy = np.zeros(len(candidate_embeddings), dtype=np.float32)
+    available = np.ones(len(candidate_embeddings), dtype=bool)
+    selected = []
+
+    for _ in range(min(top_k, len(candidate_embeddings))):
+        scores = np.where(available, lambda_mult * relevance - (1 - lambda_mult) * redundancy, -np.inf)
+        pick = int(np.argmax(scores))
+
+        selected.append(pick)
+        available[pick] = False
+        redundancy = np.maximum(redundancy, similarity[pick])
+
+    return selected
+
+
+def rerank_hits(
+    query_embeddings: np.ndarray,
+    results: List[List[Dict]],
+    store: FaissVectorStore,
+    top_k: int
+) -> List[List[Dict]]:
+    """
+    Post-retrieval stage: merge overlapping hits, then diversify with MMR
+    over the stored chunk embeddings (one read for all queries). With
+    HYBRID_SEARCH the hit scores are fused RRF scores and serve as MMR
+    relevance, so keyword-only hits are not judged by cosine similarity.
+    """
+
+    if MERGE_OVERLAPPING_HITS:
+        results = [merge_overlapping_hits(hits) for hits in results]
+
+    if MMR_LAMBDA >= 1:
+        return [hits[:top_k] for hits in results]
+
+    vector_ids = sorted({
+        vector_id
+        for hits in results
+        for hit in hits
+        for vector_id in hit.get("vector_ids", [hit["vector_id"]])
+    })
+    if not vector_ids:
+        return results
+
+    vectors = store.get_vectors(vector_ids)
+    rows = {vector_id: row for row, vector_id in enumerate(vector_ids)}
+
+    reranked = []
+    for query_embedding, hits in zip(query_embeddings, results):
+        if len(hits) <= 1:
+            reranked.append(hits)
+            continue
+
+        # a merged span is represented by the normalized mean of its chunks
+        candidates = np.vstack([
+            vectors[[rows[v] for v in hit.get("vector_ids", [hit["vector_id"]])]].mean(axis=0)
+            for hit in hits
+        ])
+        candidates /= np.linalg.norm(candidates, axis=1, keepdims=True)
+
+        relevance = None
+        if HYBRID_SEARCH:
+            # fused scores scaled so the best hit has relevance 1, like a cosine match
+            scores = np.array([hit["score"] for hit in hits], dtype=np.float32)
+            relevance = scores / scores.max()
+
+        picks = mmr_select(query_embedding, candidates, top_k, relevance=relevance)
+        reranked.append([hits[i] for i in picks])
+
+    return reranked
+
+
 def retrieve_context(
     query: str,
     store: FaissVectorStore,
-    top_k: int = TOP_K
+    top_k: int = TOP_K,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    query_embedding: Optional[np.ndarray] = None,
+    filters: Optional[Dict] = None
 ) -> List[Dict]:
     """
-    Embed the user query and retrieve top-k relevant chunks from FAISS
+    Embed the user query (unless its embedding is given) and retrieve
+    top-k relevant chunks from FAISS, optionally restricted by metadata filters
+    """
+
+    return retrieve_context_batch(
+        [query],
+        store,
+        top_k,
+        nprobe=nprobe,
+        ef_search=ef_search,
+        query_embeddings=query_embedding[None, :] if query_embedding is not None else None,
+        filters=filters
+    )[0]
+
+
+def retrieve_context_batch(
+    queries: List[str],
+    store: FaissVectorStore,
+    top_k: int = TOP_K,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    query_embeddings: Optional[np.ndarray] = None,
+    filters: Optional[Dict] = None
+) -> List[List[Dict]]:
+    """
+    Embed all queries in one encode call and retrieve their top-k chunks
+    with one multi-row FAISS search. Extra candidates are fetched for the
+    merge / MMR stage. Results are in input order.
     """
 
-    if not query or not query.strip():
+    if not queries:
+        return []
+
+    if any(not query or not query.strip() for query in queries):
         raise ValueError("Query cannot be empty")
-    
-    if store.index.ntotal == 0:
+
+    if store.live_vectors == 0:
         raise ValueError("FAISS index is empty")
-    
-    logger.info(f"Starting retrieval | query_length={len(query)} | top_k={top_k}")
 
-    # Embed query (same embedding space as documents)
-    query_embedding = embedding_model.encode(
-        [query],
-        normalize_embeddings=True
-    )
+    logger.info(f"Starting retrieval | queries={len(queries)} | top_k={top_k}")
 
-    if query_embedding.dtype != np.float32:
-        query_embedding = query_embedding.astype(np.float32)
+    if query_embeddings is None:
+        query_embeddings = embed_queries(queries)
+
+    rerank = MERGE_OVERLAPPING_HITS or MMR_LAMBDA < 1
+    fetch_k = top_k * RETRIEVAL_CANDIDATES_MULTIPLIER if rerank else top_k
+
+    # query texts drive the keyword side of hybrid search
+    results = store.search_batch(
+        query_embeddings,
+        fetch_k,
+        nprobe=nprobe,
+        ef_search=ef_search,
+        filters=filters,
+        query_texts=queries
+    )
 
-    results = store.search(query_embedding, top_k)
+    if rerank:
+        results = rerank_hits(query_embeddings, results, store, top_k)
 
     logger.info(
-        f"Retrieval completed | retrieved chunks={len(results)}"
+        f"Retrieval completed | retrieved chunks={sum(len(r) for r in results)}"
     )
 
-    return results
\ No newline at end of file
+    return results
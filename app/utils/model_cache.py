@@ -0,0 +1,45 @@
+from typing import Callable, Optional
+import os
+import shutil
+
+from app.config import MODEL_CACHE_DIR
+from app.logger import get_logger
+
+logger = get_logger()
+
+
+def baked_model_dir(kind: str, model_name: str) -> str:
+    return os.path.join(MODEL_CACHE_DIR, kind, model_name.replace("/", "--"))
+
+
+def find_baked_model(kind: str, model_name: str) -> Optional[str]:
+    """
+    Local directory of a pre-converted model, or None when nothing was baked.
+    """
+    path = baked_model_dir(kind, model_name)
+
+    if os.path.isdir(path) and os.listdir(path):
+        return path
+
+    return None
+
+
+def bake_model(kind: str, model_name: str, save: Callable[[str], None]) -> str:
+    """
+    Write a model's artifacts with `save(path)` into a temporary directory and
+    rename it into place, so a half-written bake is never picked up.
+    """
+    path = baked_model_dir(kind, model_name)
+    tmp_path = path + ".tmp"
+
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    save(tmp_path)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+    logger.info(f"Model artifacts baked | kind={kind} | model={model_name} | path={path}")
+
+    return path
@@ -0,0 +1,22 @@
+import os
+
+
+def available_cpus() -> int:
+    """
+    Number of CPUs this process may actually use, honouring affinity masks
+    and cgroup CPU quotas set by the container runtime.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+
+    return max(1, cpus)
@@ -1,6 +1,47 @@
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+
 def count_tokens(text: str, tokenizer) -> int:
     """
     Count tokens using the same tokenizer as the LLM.
     This MUST match the model tokenizer to avoid truncation.
     """
     return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def count_tokens_batch(texts: List[str], tokenizer) -> List[int]:
+    """
+    Token counts for many texts in one fast-tokenizer call.
+    """
+    if not texts:
+        return []
+
+    encoded = tokenizer(texts, add_special_tokens=False, return_attention_mask=False)
+    return [len(ids) for ids in encoded["input_ids"]]
+
+
+def iter_with_token_counts(
+    chunks: Iterable[Dict],
+    tokenizer,
+    batch_size: int
+) -> Iterator[Dict]:
+    """
+    Attach `token_count` (of the stripped chunk text, as packed into prompts)
+    to a stream of chunks, tokenizing them in batches. Chunks that already
+    carry a count are passed through.
+    """
+    chunks = iter(chunks)
+
+    while True:
+        batch = list(islice(chunks, batch_size))
+        if not batch:
+            break
+
+        pending = [chunk for chunk in batch if chunk.get("token_count") is None]
+        counts = count_tokens_batch([chunk["text"].strip() for chunk in pending], tokenizer)
+
+        for chunk, count in zip(pending, counts):
+            chunk["token_count"] = count
+
+        yield from batch
@@ -0,0 +1,167 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+import os
+import re
+import threading
+
+from app.config import (
+    COLLECTION_MEMORY_BUDGET_MB,
+    COLLECTIONS_DIR,
+    DEFAULT_COLLECTION,
+    INDEX_DIR,
+)
+from app.logger import get_logger
+from app.vectorstore.faiss_store import FaissVectorStore
+from app.vectorstore.segments import MANIFEST_FILE, read_manifest
+
+logger = get_logger()
+
+COLLECTION_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+
+class CollectionNotFoundError(LookupError):
+    pass
+
+
+def validate_collection_name(name: str) -> None:
+    if not COLLECTION_NAME_PATTERN.match(name):
+        raise ValueError(
+            "Collection names must be 1-64 letters, digits, '-' or '_', starting with a letter or digit"
+        )
+
+
+def collection_dir(name: str) -> str:
+    # the default collection keeps the original single-index location
+    if name == DEFAULT_COLLECTION:
+        return INDEX_DIR
+
+    return os.path.join(COLLECTIONS_DIR, name)
+
+
+def list_collections() -> List[str]:
+    """
+    Names of collections that exist on disk.
+    """
+    names = []
+
+    if os.path.exists(os.path.join(INDEX_DIR, MANIFEST_FILE)):
+        names.append(DEFAULT_COLLECTION)
+
+    if os.path.isdir(COLLECTIONS_DIR):
+        names.extend(sorted(
+            name for name in os.listdir(COLLECTIONS_DIR)
+            if name != DEFAULT_COLLECTION
+            and os.path.exists(os.path.join(COLLECTIONS_DIR, name, MANIFEST_FILE))
+        ))
+
+    return names
+
+
+class CollectionRegistry:
+    """
+    Named collections, each a FaissVectorStore in its own directory.
+
+    Loaded stores are kept in LRU order. When their combined index memory
+    exceeds the budget, the least recently used ones are unloaded; a store
+    is never unloaded while a request or ingestion job is using it or while
+    it is compacting / rebuilding in the background.
+    """
+
+    def __init__(self, memory_budget_bytes: int = COLLECTION_MEMORY_BUDGET_MB * 1024 * 1024):
+        self.memory_budget_bytes = memory_budget_bytes
+
+        self._resident: "OrderedDict[str, FaissVectorStore]" = OrderedDict()
+        self._pins: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        # serializes loading per collection without blocking the others
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def acquire(self, name: str, embedding_dim: Optional[int] = None) -> FaissVectorStore:
+        """
+        Return the collection's store, loading it from disk if needed, and pin
+        it until release(). With embedding_dim a missing collection is created.
+        """
+        validate_collection_name(name)
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                store = self._resident.get(name)
+                if store is not None:
+                    self._resident.move_to_end(name)
+                    self._pins[name] = self._pins.get(name, 0) + 1
+                    return store
+
+            path = collection_dir(name)
+            # only a missing manifest means a new collection; any other load
+            # error (e.g. a lost segment file) must not replace existing data
+            if read_manifest(path) is not None:
+                store = FaissVectorStore.load(path)
+                logger.info(f"Collection loaded | collection={name}")
+            elif embedding_dim is None:
+                raise CollectionNotFoundError(f"Collection '{name}' not found")
+            else:
+                store = FaissVectorStore(embedding_dim, path)
+                logger.info(f"Collection created | collection={name}")
+
+            with self._lock:
+                self._resident[name] = store
+                self._pins[name] = self._pins.get(name, 0) + 1
+                self._evict()
+
+        return store
+
+    def release(self, name: str) -> None:
+        with self._lock:
+            self._pins[name] -= 1
+            if not self._pins[name]:
+                del self._pins[name]
+            self._evict()
+
+    @contextmanager
+    def use(self, name: str, embedding_dim: Optional[int] = None) -> Iterator[FaissVectorStore]:
+        store = self.acquire(name, embedding_dim)
+        try:
+            yield store
+        finally:
+            self.release(name)
+
+    def _evict(self) -> None:
+        # caller holds self._lock
+        total = sum(store.memory_bytes() for store in self._resident.values())
+
+        for name in list(self._resident):
+            if total <= self.memory_budget_bytes:
+                break
+
+            store = self._resident[name]
+            if self._pins.get(name) or store.busy():
+                continue
+
+            del self._resident[name]
+            total -= store.memory_bytes()
+            store.close()
+
+            logger.info(f"Collection unloaded | collection={name} | resident_bytes={total}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            resident = {
+                name: store.memory_bytes() for name, store in self._resident.items()
+            }
+
+        return {
+            "resident": resident,
+            "resident_bytes": sum(resident.values()),
+            "memory_budget_bytes": self.memory_budget_bytes,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            for store in self._resident.values():
+                store.close()
+            self._resident.clear()
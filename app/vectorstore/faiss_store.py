@@ -1,120 +1,1109 @@
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional, Tuple
 import os
-import json
+import threading
+import uuid
 import faiss
 import numpy as np
 
-from app.config import INDEX_PATH, METADATA_PATH
+from app.config import (
+    ANN_PROMOTION_THRESHOLD,
+    ANN_TRAIN_SAMPLE_SIZE,
+    COMMIT_ADD_BATCH_SIZE,
+    FILTER_EXACT_SEARCH_MAX,
+    HYBRID_SEARCH,
+    INDEX_DIR,
+    INDEX_TYPE,
+    MAX_SEGMENTS,
+    SEGMENT_LOAD_BATCH_SIZE,
+    STORAGE_RESCORE,
+    STORAGE_TRAIN_MIN_VECTORS,
+    TOMBSTONE_COMPACTION_RATIO,
+    VECTOR_STORAGE,
+)
 from app.logger import get_logger
+from app.vectorstore.index_factory import (
+    build_index,
+    index_memory_bytes,
+    index_type_of,
+    is_compressed,
+    rescore_candidates,
+    search_parameters,
+    storage_factory_string,
+    storage_needs_training,
+    train_index,
+    validate_storage,
+)
+from app.vectorstore.lexical_index import (
+    LexicalSegment,
+    LexicalSegmentBuilder,
+    bm25_search,
+    reciprocal_rank_fusion,
+)
+from app.vectorstore.metadata_store import ChunkMetadataStore
+from app.vectorstore.segments import (
+    SegmentWriter,
+    filter_segment_files,
+    iter_segment_vectors,
+    lexical_path,
+    merge_segment_files,
+    open_segment_vectors,
+    read_manifest,
+    read_segment_ids,
+    remove_orphan_files,
+    remove_segment_files,
+    snapshot_path,
+    write_manifest,
+    write_segment_ids,
+)
 
 logger = get_logger()
 
+# IndexIDMap2 keeps an id per row plus a reverse hash map; the store keeps its own id array
+ID_MAP_BYTES_PER_VECTOR = 56
+
+def exact_top_k(
+    query_embeddings: np.ndarray,
+    vectors: np.ndarray,
+    vector_ids: np.ndarray,
+    top_k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Inner-product top-k of each query over the given vectors, shaped like
+    faiss search output (missing results have id -1).
+    """
+    scores = np.full((len(query_embeddings), top_k), -np.inf, dtype=np.float32)
+    indices = np.full((len(query_embeddings), top_k), -1, dtype=np.int64)
+
+    k = min(top_k, len(vectors))
+    if k == 0:
+        return scores, indices
+
+    similarity = query_embeddings @ vectors.T
+    top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(similarity, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+
+    scores[:, :k] = np.take_along_axis(top_scores, order, axis=1)
+    indices[:, :k] = vector_ids[np.take_along_axis(top, order, axis=1)]
+
+    return scores, indices
+
+
 class FaissVectorStore:
     """
         Disk-backed FAISS vector store for cosine similarity search.
         Designed for CPU-only, small-to-medium scale RAG workloads.
+
+        On disk the store is a list of append-only segments (vectors + metadata)
+        referenced by a manifest. Each ingest writes one new segment, so
+        persistence cost is proportional to the new document only.
+
+        The store starts as an exact IndexFlatIP and is rebuilt as the
+        configured ANN index (INDEX_TYPE) once it passes ANN_PROMOTION_THRESHOLD.
+        Trained indexes are snapshotted so restarts do not retrain.
+
+        Every chunk gets a stable vector id (the index is wrapped in an
+        IndexIDMap2), so documents can be deleted or replaced. Deleted ids are
+        tombstoned and excluded from searches; once they pass
+        TOMBSTONE_COMPACTION_RATIO of the index they are purged from the
+        segments in the background.
+
+        Each segment also carries BM25 postings of its chunk texts; with
+        HYBRID_SEARCH, keyword hits are fused with vector hits by rank.
+
+        Segments always hold float32 vectors; `storage` (float32 | fp16 |
+        sq8 | pq) only sets how the in-memory index encodes them. Compressed
+        indexes can re-score their shortlist exactly from the segments.
     """
-    
-    def __init__(self, embedding_dim: int):
+
+    def __init__(
+        self,
+        embedding_dim: int,
+        storage_dir: str = INDEX_DIR,
+        storage: str = VECTOR_STORAGE,
+        rescore: bool = STORAGE_RESCORE
+    ):
         """
         Initialize FAISS inedx for cosine similarity search.
         Assumes embeddings are L2-normalized.
         """
 
+        validate_storage(storage)
+
         self.embedding_dim = embedding_dim
-        self.index = faiss.IndexFlatIP(embedding_dim)
-        self.metadata: List[Dict] = []
+        self.storage_dir = storage_dir
+        self.storage = storage
+        self.rescore = rescore
 
-        logger.info(f"Initialized FAISS IndexFlatIP  | embedding_dim={embedding_dim}")
+        # encodings that need training start as float32 until enough vectors arrive
+        self.index_storage = "float32" if storage_needs_training(storage) else storage
+        self.index = faiss.IndexIDMap2(build_index("flat", embedding_dim, 0, self.index_storage))
+        self.index_type = "flat"
+
+        # vector id (row in the FAISS index) -> chunk metadata, fetched lazily
+        self.metadata = ChunkMetadataStore(storage_dir)
+        if read_manifest(storage_dir) is None:
+            # rows left behind by writers that never published a manifest
+            self.metadata.discard_uncommitted(0)
+
+        # live segments in index order: [{"name": ..., "count": ...}]
+        self.segments: List[Dict] = []
+        # trained index on disk: {"name": ..., "type": ..., "ntotal": ...}
+        self.snapshot: Optional[Dict] = None
+        self._next_segment = 1
+
+        # vector id of every segment row in index order; ids only grow, so this is sorted
+        self._ids = np.empty(0, dtype=np.int64)
+        self._next_vector_id = 0
+
+        # segment name -> BM25 postings of its rows
+        self._lexical: Dict[str, LexicalSegment] = {}
+
+        # ids of deleted vectors still in the index, and the selector that hides them
+        self._tombstones = np.empty(0, dtype=np.int64)
+        self._tombstone_selector: Optional[faiss.IDSelector] = None
+        self._tombstone_batch: Optional[faiss.IDSelectorBatch] = None
+
+        # first vector id of a segment whose rows are still being added; ids
+        # only grow, so everything from it on is hidden from unfiltered searches
+        self._pending_from: Optional[int] = None
+        self._pending_range: Optional[faiss.IDSelectorRange] = None
+        # what unfiltered searches use: tombstones and pending rows excluded
+        self._search_selector: Optional[faiss.IDSelector] = None
+
+        # bumped whenever searchable content changes; the random id tells apart
+        # stores recreated in the same directory
+        self.store_id = uuid.uuid4().hex
+        self.version = 0
+
+        self._compaction_lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        # one commit at a time; rebuilds and purges take it to see no half-added segment
+        self._commit_lock = threading.Lock()
+
+        # ingestion workers mutate the index while queries search it
+        self._lock = threading.RLock()
+
+        logger.info(
+            f"Initialized FAISS index | embedding_dim={embedding_dim} | storage={self.index_storage}"
+        )
+
+
+    def segment_writer(self) -> SegmentWriter:
+        """
+        Open a writer for a new segment. Use as a context manager: the segment
+        is committed on success and discarded if the block raises.
+        """
+
+        os.makedirs(self.storage_dir, exist_ok=True)
+
+        with self._lock:
+            name = f"seg-{self._next_segment:06d}"
+            self._next_segment += 1
+
+        return SegmentWriter(self, name)
 
-        
     def add(self, embeddings: np.ndarray, metadata: List[Dict]) -> None:
         """
-        Add Embeddings and their corresponding metadata to the index.
+        Add Embeddings and their corresponding metadata to the index
+        as a single new segment.
+        """
+
+        with self.segment_writer() as segment:
+            segment.add(embeddings, metadata)
+
+    def commit_segment(self, name: str, count: int, lexical: Optional[LexicalSegment] = None) -> int:
+        """
+        Load a durable segment into the in-memory index and publish it in the manifest.
+        Returns the number of chunks of earlier document versions it tombstoned.
+        """
+
+        if lexical is None:
+            lexical = LexicalSegment.load(lexical_path(self.storage_dir, name))
+
+        logger.info(f"Adding Embeddings to FAISS | segment={name} | count={count}")
+
+        with self._commit_lock:
+            with self._lock:
+                first_vector_id = self._next_vector_id
+                self._next_vector_id += count
+
+                ids = np.arange(first_vector_id, first_vector_id + count, dtype=np.int64)
+                write_segment_ids(self.storage_dir, name, ids)
+
+                self._pending_from = first_vector_id
+                self._update_search_selector()
+
+            # added in batches so queries are not blocked for the whole segment
+            # (HNSW inserts are slow); the rows stay hidden until it is published
+            segment = [{"name": name, "count": count}]
+            for vectors, batch_ids in self._iter_vectors(segment, batch_size=COMMIT_ADD_BATCH_SIZE):
+                with self._lock:
+                    self.index.add_with_ids(vectors, batch_ids)
+
+            with self._lock:
+                self._ids = np.concatenate([self._ids, ids])
+                self._lexical[name] = lexical
+                self.segments.append({"name": name, "count": count})
+
+                self.version += 1
+                # the manifest goes first: a crash before the metadata commit is
+                # rolled forward on load instead of losing the document
+                self._write_manifest()
+
+                # a new version of an existing document tombstones the old one
+                superseded = self.metadata.assign_vector_ids(name, first_vector_id)
+                if superseded:
+                    self._add_tombstones(superseded)
+
+                self._pending_from = None
+                self._update_search_selector()
+
+        logger.info(
+            f"Segment committed | segment={name} | segments={len(self.segments)} | "
+            f"total_vectors={self.index.ntotal}"
+        )
+
+        self._maybe_compact()
+        self._maybe_purge()
+        self._maybe_rebuild()
+
+        return len(superseded)
+
+    def delete_document(self, doc_id: str) -> Optional[int]:
+        """
+        Tombstone all chunks of a document. Returns the number of chunks
+        deleted, or None if the document does not exist.
+        """
+
+        with self._lock:
+            vector_ids = self.metadata.delete_document(doc_id)
+            if vector_ids is None:
+                return None
+
+            self._add_tombstones(vector_ids)
+            self.version += 1
+            self._write_manifest()
+
+        logger.info(
+            f"Document deleted | doc_id={doc_id} | chunks={len(vector_ids)} | "
+            f"tombstones={len(self._tombstones)}"
+        )
+
+        self._maybe_purge()
+
+        return len(vector_ids)
+
+    def compact(self) -> None:
+        """
+        Merge the newest run of small segments into one. A segment is merged
+        when it is no larger than everything newer than it, so large old
+        segments are rewritten rarely.
+        """
+
+        if not self._compaction_lock.acquire(blocking=False):
+            return
+
+        try:
+            with self._lock:
+                snapshot = list(self.segments)
+
+            start = len(snapshot) - 1
+            tail = snapshot[-1]["count"] if snapshot else 0
+            while start > 0 and snapshot[start - 1]["count"] <= tail:
+                start -= 1
+                tail += snapshot[start]["count"]
+
+            run = snapshot[start:]
+            if len(run) < 2:
+                return
+
+            with self._lock:
+                merged_name = f"seg-{self._next_segment:06d}"
+                self._next_segment += 1
+
+            logger.info(f"Compacting segments | merging={len(run)} | into={merged_name}")
+
+            merge_segment_files(self.storage_dir, [seg["name"] for seg in run], merged_name)
+
+            merged_lexical = LexicalSegment.merge([self._lexical[seg["name"]] for seg in run])
+            merged_lexical.save(lexical_path(self.storage_dir, merged_name))
+
+            with self._lock:
+                # commits only append, so the snapshot is still a prefix of the live list
+                end = len(snapshot)
+                self.segments = (
+                    self.segments[:start]
+                    + [{"name": merged_name, "count": tail}]
+                    + self.segments[end:]
+                )
+                self._write_manifest()
+
+                for seg in run:
+                    del self._lexical[seg["name"]]
+                self._lexical[merged_name] = merged_lexical
+
+            for seg in run:
+                remove_segment_files(self.storage_dir, seg["name"])
+
+            logger.info(f"Compaction completed | segments={len(self.segments)}")
+
+        except Exception:
+            logger.exception("Segment compaction failed")
+
+        finally:
+            self._compaction_lock.release()
+
+        self._maybe_purge()
+
+    def rebuild_index(self, index_type: Optional[str] = None, storage: Optional[str] = None) -> None:
+        """
+        Rebuild the in-memory index as `index_type` (default INDEX_TYPE) with
+        `storage` encoding (default the store's) from the vectors on disk:
+        train on a sample, add everything, snapshot it, then swap it in.
+        Commits that land during the rebuild are replayed before the swap.
         """
 
-        if embeddings.ndim != 2:
-            raise ValueError("Embedding must be a 2D array")
-        
-        if embeddings.shape[0] != len(metadata):
-            raise ValueError("Embeddings count does not match metadata count")
-        
-        logger.info(f"Adding Embeddings to FAISS | count={embeddings.shape[0]}")
+        index_type = index_type or INDEX_TYPE
+        storage = storage or self.storage
+
+        if not self._rebuild_lock.acquire(blocking=False):
+            return
+
+        # the build reads segment files, which a running compaction may delete
+        self._compaction_lock.acquire()
+        rebuilt = False
+
+        try:
+            with self._commit_lock, self._lock:
+                segments = list(self.segments)
+                ntotal = self.index.ntotal
+
+            logger.info(
+                f"Rebuilding FAISS index | type={index_type} | storage={storage} | total_vectors={ntotal}"
+            )
+
+            index, snapshot = self._build_from_segments(index_type, storage, segments)
+
+            with self._commit_lock, self._lock:
+                # replay commits that landed while the index was being built
+                for vectors, ids in self._iter_vectors(self.segments, start=ntotal):
+                    index.add_with_ids(vectors, ids)
+
+                previous = self.snapshot
+                self.index = index
+                self.index_type = index_type
+                self.index_storage = storage
+                self.snapshot = snapshot
+                self._write_manifest()
+
+            if previous is not None:
+                os.remove(snapshot_path(self.storage_dir, previous["name"]))
+
+            logger.info(
+                f"FAISS index rebuilt | type={index_type} | storage={storage} | "
+                f"total_vectors={self.index.ntotal}"
+            )
+            rebuilt = True
+
+        except Exception:
+            logger.exception("FAISS index rebuild failed")
 
-        if embeddings.dtype != np.float32:
-            embeddings = embeddings.astype(np.float32)
+        finally:
+            self._compaction_lock.release()
+            self._rebuild_lock.release()
 
-        self.index.add(embeddings)
-        self.metadata.extend(metadata)
+        # commits skip compaction while the rebuild holds its lock
+        self._maybe_compact()
+        self._maybe_purge()
+        if rebuilt:
+            # the storage mode may have changed while this rebuild was running
+            self._maybe_rebuild()
 
-    
-    def save(self) -> None:
+    def purge_deleted(self) -> None:
         """
-        Perisits FAISS index and metadata to disk.
+        Reclaim the space held by tombstoned vectors: rewrite the segments
+        that contain them without those rows, rebuild the index from the
+        result, then swap both in and drop the purged tombstones. Excludes
+        segment compaction and index rebuilds while it runs.
         """
 
-        os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
-        os.makedirs(os.path.dirname(METADATA_PATH), exist_ok=True)
+        if not self._compaction_lock.acquire(blocking=False):
+            return
+
+        if not self._rebuild_lock.acquire(blocking=False):
+            self._compaction_lock.release()
+            return
+
+        rewritten = {}
+        rewritten_lexical = {}
+        completed = False
+
+        try:
+            with self._commit_lock, self._lock:
+                segments = list(self.segments)
+                rows = self.index.ntotal
+                purged = np.intersect1d(self._tombstones, self._ids[:rows])
+
+            if not len(purged):
+                return
+
+            logger.info(f"Purging deleted vectors | tombstones={len(purged)} | total_vectors={rows}")
+
+            keep_rows = ~np.isin(self._ids[:rows], purged)
+            offset = 0
+            for seg in segments:
+                keep = keep_rows[offset:offset + seg["count"]]
+                offset += seg["count"]
+                if keep.all():
+                    continue
+
+                # fully deleted segments are dropped rather than rewritten
+                if not keep.any():
+                    rewritten[seg["name"]] = None
+                    continue
+
+                with self._lock:
+                    name = f"seg-{self._next_segment:06d}"
+                    self._next_segment += 1
+
+                count = filter_segment_files(
+                    self.storage_dir, seg["name"], name, keep, self.embedding_dim, SEGMENT_LOAD_BATCH_SIZE
+                )
+                rewritten[seg["name"]] = {"name": name, "count": count}
+
+                rewritten_lexical[name] = self._lexical[seg["name"]].filter(keep)
+                rewritten_lexical[name].save(lexical_path(self.storage_dir, name))
+
+            kept_segments = [
+                rewritten.get(seg["name"], seg) for seg in segments if rewritten.get(seg["name"], seg)
+            ]
+            kept = int(keep_rows.sum())
+
+            # a mostly deleted corpus may no longer be worth (or able to train) an ANN index
+            index_type, storage = self._target_layout(kept)
+            index, snapshot = self._build_from_segments(index_type, storage, kept_segments)
+
+            with self._commit_lock, self._lock:
+                # commits only append, so the purged segments are still a prefix of the live list
+                for vectors, ids in self._iter_vectors(self.segments, start=rows):
+                    index.add_with_ids(vectors, ids)
+
+                previous = self.snapshot
+                self.segments = kept_segments + self.segments[len(segments):]
+                self._ids = np.concatenate([self._ids[:rows][keep_rows], self._ids[rows:]])
+                self.index = index
+                self.index_type = index_type
+                self.index_storage = storage
+                self.snapshot = snapshot
+                self._write_manifest()
+
+                for name in rewritten:
+                    del self._lexical[name]
+                self._lexical.update(rewritten_lexical)
+
+                self.metadata.remove_tombstones(purged.tolist())
+                self._set_tombstones(np.setdiff1d(self._tombstones, purged))
+
+            for name in rewritten:
+                remove_segment_files(self.storage_dir, name)
+            if previous is not None:
+                os.remove(snapshot_path(self.storage_dir, previous["name"]))
+
+            logger.info(
+                f"Deleted vectors purged | purged={len(purged)} | segments_rewritten={len(rewritten)} | "
+                f"total_vectors={self.index.ntotal}"
+            )
+            completed = True
+
+        except Exception:
+            logger.exception("Purging deleted vectors failed")
+            live = {seg["name"] for seg in self.segments}
+            for seg in rewritten.values():
+                if seg is not None and seg["name"] not in live:
+                    remove_segment_files(self.storage_dir, seg["name"])
+
+        finally:
+            self._rebuild_lock.release()
+            self._compaction_lock.release()
+            # commits and deletes skip compaction and purging while the purge
+            # holds its locks; a failed purge is not retried in a loop
+            self._maybe_compact()
+            if completed:
+                self._maybe_purge()
+
+    def _maybe_compact(self) -> None:
+        """
+        Merge segments once there are more than MAX_SEGMENTS of them.
+        """
+        if len(self.segments) > MAX_SEGMENTS and not self._compaction_lock.locked():
+            threading.Thread(target=self.compact, name="faiss-compaction", daemon=True).start()
+
+    def _maybe_purge(self) -> None:
+        """
+        Purge deleted vectors once they make up TOMBSTONE_COMPACTION_RATIO of the index.
+        """
+        if (
+            TOMBSTONE_COMPACTION_RATIO
+            and len(self._tombstones)
+            and len(self._tombstones) >= TOMBSTONE_COMPACTION_RATIO * self.index.ntotal
+            and not self.busy()
+        ):
+            threading.Thread(target=self.purge_deleted, name="faiss-purge", daemon=True).start()
+
+    def _build_from_segments(self, index_type: str, storage: str, segments: List[Dict]):
+        """
+        Build an id-mapped index of `index_type` and `storage` encoding over
+        the given segments and, unless it is a plain Flat index that loading
+        rebuilds cheaply, snapshot it to disk. Returns (index, snapshot).
+        """
+        ntotal = sum(seg["count"] for seg in segments)
+
+        index = faiss.IndexIDMap2(build_index(index_type, self.embedding_dim, ntotal, storage))
+        if not index.is_trained:
+            train_index(index, self._sample_vectors(segments, ANN_TRAIN_SAMPLE_SIZE))
+
+        for vectors, ids in self._iter_vectors(segments):
+            index.add_with_ids(vectors, ids)
 
-        logger.warning("Overwriting existing FAISS index on disk")
+        snapshot = None
+        if index_type != "flat" or storage_needs_training(storage):
+            with self._lock:
+                name = f"index-{self._next_segment:06d}"
+                self._next_segment += 1
 
-        faiss.write_index(self.index, INDEX_PATH)
+            path = snapshot_path(self.storage_dir, name)
+            faiss.write_index(index, path + ".tmp")
+            os.replace(path + ".tmp", path)
+            snapshot = {"name": name, "type": index_type, "storage": storage, "ntotal": ntotal}
 
-        with open(METADATA_PATH, "w") as f:
-            json.dump(self.metadata, f)
+        return index, snapshot
 
-        logger.info(f"FAISS index saved | total_vectors={self.index.ntotal}")
+    def _add_tombstones(self, vector_ids: List[int]) -> None:
+        self._set_tombstones(np.union1d(self._tombstones, np.asarray(vector_ids, dtype=np.int64)))
+
+    def _set_tombstones(self, tombstones: np.ndarray) -> None:
+        self._tombstones = tombstones
+
+        if len(tombstones):
+            # IDSelectorNot does not own the selector it wraps, so both are kept
+            self._tombstone_batch = faiss.IDSelectorBatch(tombstones)
+            self._tombstone_selector = faiss.IDSelectorNot(self._tombstone_batch)
+        else:
+            self._tombstone_batch = None
+            self._tombstone_selector = None
+
+        self._update_search_selector()
+
+    def _update_search_selector(self) -> None:
+        """
+        Combine the tombstone selector with the range hiding pending rows.
+        """
+        if self._pending_from is None:
+            self._pending_range = None
+            self._search_selector = self._tombstone_selector
+            return
+
+        # selectors do not own the ones they combine, so all are kept
+        self._pending_range = faiss.IDSelectorRange(0, self._pending_from)
+        if self._tombstone_selector is None:
+            self._search_selector = self._pending_range
+        else:
+            self._search_selector = faiss.IDSelectorAnd(self._pending_range, self._tombstone_selector)
+
+    def _target_layout(self, ntotal: int) -> Tuple[str, str]:
+        """
+        (index type, storage) the index should have at `ntotal` vectors.
+        """
+        index_type = INDEX_TYPE if ntotal >= ANN_PROMOTION_THRESHOLD else "flat"
+
+        storage = self.storage
+        if storage_needs_training(storage) and ntotal < STORAGE_TRAIN_MIN_VECTORS:
+            storage = "float32"
+
+        return index_type, storage
+
+    def _maybe_rebuild(self) -> None:
+        """
+        Promote Flat to the configured ANN index once the corpus is large
+        enough, and re-encode the index when its storage mode should change.
+        """
+        index_type, storage = self._target_layout(self.index.ntotal)
+
+        if (
+            (index_type, storage) != (self.index_type, self.index_storage)
+            and not self._rebuild_lock.locked()
+        ):
+            threading.Thread(
+                target=self.rebuild_index, args=(index_type, storage), name="faiss-rebuild", daemon=True
+            ).start()
+
+    def _iter_vectors(
+        self,
+        segments: List[Dict],
+        start: int = 0,
+        batch_size: int = SEGMENT_LOAD_BATCH_SIZE
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Stream (vectors, ids) batches from row `start` onwards of the given
+        segments, in index order.
+        """
+        offset = 0
+        for seg in segments:
+            if offset + seg["count"] > start:
+                row = max(0, start - offset)
+                ids = read_segment_ids(self.storage_dir, seg["name"])
+
+                for vectors in iter_segment_vectors(
+                    self.storage_dir,
+                    seg["name"],
+                    self.embedding_dim,
+                    batch_size,
+                    start_row=row
+                ):
+                    yield vectors, ids[row:row + len(vectors)]
+                    row += len(vectors)
+
+            offset += seg["count"]
+
+    def _sample_vectors(self, segments: List[Dict], sample_size: int) -> np.ndarray:
+        """
+        Uniform random sample of vectors across segments, used for training.
+        """
+        total = sum(seg["count"] for seg in segments)
+        sample_ids = np.sort(
+            np.random.default_rng(0).choice(total, size=min(sample_size, total), replace=False)
+        )
+
+        return self._read_rows(segments, sample_ids)
+
+    def _read_rows(self, segments: List[Dict], rows: np.ndarray) -> np.ndarray:
+        """
+        Gather vectors by row position from the memory-mapped segment files, in the order given.
+        """
+        counts = np.array([seg["count"] for seg in segments], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        owners = np.searchsorted(offsets, rows, side="right") - 1
+
+        vectors = np.empty((len(rows), self.embedding_dim), dtype=np.float32)
+        for segment_index in np.unique(owners):
+            seg = segments[segment_index]
+            mask = owners == segment_index
+            segment_vectors = open_segment_vectors(self.storage_dir, seg["name"], self.embedding_dim)
+            vectors[mask] = segment_vectors[rows[mask] - offsets[segment_index]]
+
+        return vectors
+
+    def _load_ids(self) -> None:
+        """
+        Read the vector ids of all segments. Segments written before ids were
+        stored are numbered by row position, which is what their ids were.
+        """
+        ids = []
+        offset = 0
+
+        for seg in self.segments:
+            segment_ids = read_segment_ids(self.storage_dir, seg["name"])
+            if segment_ids is None:
+                segment_ids = np.arange(offset, offset + seg["count"], dtype=np.int64)
+                write_segment_ids(self.storage_dir, seg["name"], segment_ids)
+
+            ids.append(segment_ids)
+            offset += seg["count"]
+
+        self._ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+
+    def _recover_segments(self) -> None:
+        """
+        Commit the metadata of segments that reached the manifest before
+        their writer crashed, under the ids in their segment files.
+        """
+        pending = set(self.metadata.uncommitted_segments())
+        offset = 0
+
+        for seg in self.segments:
+            if seg["name"] in pending:
+                superseded = self.metadata.assign_vector_ids(seg["name"], int(self._ids[offset]))
+                logger.warning(
+                    f"Recovered uncommitted segment | segment={seg['name']} | superseded={len(superseded)}"
+                )
+
+            offset += seg["count"]
+
+    def _load_lexical(self) -> None:
+        """
+        Read the BM25 postings of all segments. Segments written before
+        postings were stored are indexed from their chunk texts once.
+        """
+        offset = 0
+
+        for seg in self.segments:
+            path = lexical_path(self.storage_dir, seg["name"])
+
+            if os.path.exists(path):
+                self._lexical[seg["name"]] = LexicalSegment.load(path)
+            else:
+                ids = self._ids[offset:offset + seg["count"]]
+                chunks = self.metadata.get(ids.tolist())
+
+                builder = LexicalSegmentBuilder()
+                # deleted rows have no metadata and stay empty until purged
+                builder.add(chunks[int(i)]["text"] if int(i) in chunks else "" for i in ids)
+
+                self._lexical[seg["name"]] = builder.build()
+                self._lexical[seg["name"]].save(path)
+
+                logger.info(f"Built keyword index for segment | segment={seg['name']} | rows={seg['count']}")
+
+            offset += seg["count"]
+
+    def _write_manifest(self) -> None:
+        write_manifest(self.storage_dir, {
+            "embedding_dim": self.embedding_dim,
+            "next_segment": self._next_segment,
+            "next_vector_id": self._next_vector_id,
+            "segments": self.segments,
+            "snapshot": self.snapshot,
+            "storage": self.storage,
+            "rescore": self.rescore,
+            "store_id": self.store_id,
+            "version": self.version,
+        })
 
 
     @classmethod
-    def load(cls) -> "FaissVectorStore":
+    def load(cls, storage_dir: str = INDEX_DIR) -> "FaissVectorStore":
         """
-        Load FAISS index and metadata from disk.
+        Load FAISS index and metadata from the segments listed in the manifest.
         """
 
-        if not os.path.exists(INDEX_PATH):
-            raise FileNotFoundError("FAISS index file not found")
+        manifest = read_manifest(storage_dir)
 
-        if not os.path.exists(METADATA_PATH):
-            raise FileNotFoundError("Metadata file not found")
+        if manifest is None:
+            raise FileNotFoundError("FAISS index manifest not found")
 
-        index = faiss.read_index(INDEX_PATH)
+        store = cls(
+            manifest["embedding_dim"],
+            storage_dir,
+            manifest.get("storage", VECTOR_STORAGE),
+            manifest.get("rescore", STORAGE_RESCORE)
+        )
+        store._next_segment = manifest["next_segment"]
+        store.segments = manifest["segments"]
+        store.snapshot = manifest.get("snapshot")
+        store.store_id = manifest.get("store_id", store.store_id)
+        store.version = manifest.get("version", 0)
+        # stores written before ids were stable numbered vectors by position
+        migrated = "next_vector_id" not in manifest
+        store._next_vector_id = manifest.get(
+            "next_vector_id", sum(seg["count"] for seg in store.segments)
+        )
+
+        remove_orphan_files(
+            storage_dir,
+            [seg["name"] for seg in store.segments],
+            store.snapshot["name"] if store.snapshot else None
+        )
+        store._load_ids()
+        store._recover_segments()
+        store.metadata.discard_uncommitted(store._next_vector_id)
+        store._load_lexical()
 
-        with open(METADATA_PATH, "r") as f:
-            metadata = json.load(f)
+        start = 0
+        if store.snapshot is not None:
+            index = faiss.read_index(snapshot_path(storage_dir, store.snapshot["name"]))
 
-        store = cls(index.d)
-        store.index = index
-        store.metadata = metadata
+            if isinstance(faiss.downcast_index(index), faiss.IndexIDMap2):
+                store.index = index
+                # flat PQ is an IVF index underneath, so the recorded type wins
+                store.index_type = store.snapshot.get("type") or index_type_of(index)
+                store.index_storage = store.snapshot.get("storage", "float32")
+                start = store.snapshot["ntotal"]
+            else:
+                # snapshots without an id map predate stable ids; the index is rebuilt instead
+                logger.warning(f"Discarding index snapshot without ids | snapshot={store.snapshot['name']}")
+                os.remove(snapshot_path(storage_dir, store.snapshot["name"]))
+                store.snapshot = None
+                migrated = True
+
+        # replay vectors committed after the snapshot was taken
+        for vectors, ids in store._iter_vectors(store.segments, start=start):
+            store.index.add_with_ids(vectors, ids)
+
+        # tombstones of vectors that were already purged are dropped
+        tombstones = np.array(store.metadata.tombstones(), dtype=np.int64)
+        live = np.intersect1d(tombstones, store._ids)
+        if len(live) < len(tombstones):
+            store.metadata.remove_tombstones(np.setdiff1d(tombstones, live).tolist())
+        store._set_tombstones(live)
+
+        if migrated:
+            store._write_manifest()
 
         logger.info(
-            f"FAISS index loaded | total_vectors={index.ntotal}"
+            f"FAISS index loaded | type={store.index_type} | segments={len(store.segments)} | "
+            f"total_vectors={store.index.ntotal} | deleted={len(store._tombstones)}"
         )
 
+        store._maybe_compact()
+        store._maybe_purge()
+        store._maybe_rebuild()
+
         return store
 
-    def search(self, query_embedding: np.ndarray, top_k: int) -> List[Dict]:
+    @property
+    def live_vectors(self) -> int:
+        """
+        Number of searchable vectors, excluding deleted ones not yet purged
+        and those of a segment still being added.
+        """
+        return len(self._ids) - len(self._tombstones)
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate memory held by the in-memory index.
+        """
+        return (
+            index_memory_bytes(self.index_type, self.embedding_dim, self.index.ntotal, self.index_storage)
+            + ID_MAP_BYTES_PER_VECTOR * self.index.ntotal
+            + sum(lexical.nbytes for lexical in self._lexical.values())
+        )
+
+    def busy(self) -> bool:
+        """
+        True while a background compaction or index rebuild is running.
+        """
+        return self._compaction_lock.locked() or self._rebuild_lock.locked()
+
+    def close(self) -> None:
+        self.metadata.close()
+
+    @property
+    def index_version(self) -> str:
+        """
+        Identifies the searchable content; changes on every ingest and delete.
+        Caches of derived answers are keyed by it.
+        """
+        return f"{self.store_id}:{self.version}"
+
+    def get_vectors(self, vector_ids: List[int]) -> np.ndarray:
+        """
+        Stored float32 vectors for the given ids, read from the segment files.
+        """
+        vector_ids = np.asarray(vector_ids, dtype=np.int64)
+
+        # compaction only deletes merged files after swapping the segment list under this lock
+        with self._lock:
+            rows = np.searchsorted(self._ids, vector_ids)
+            found = rows < len(self._ids)
+            found[found] = self._ids[rows[found]] == vector_ids[found]
+            if not found.all():
+                raise KeyError(f"Unknown vector ids: {vector_ids[~found].tolist()}")
+
+            return self._read_rows(self.segments, rows)
+
+    def _search_filtered(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int,
+        vector_ids: np.ndarray,
+        nprobe: Optional[int],
+        ef_search: Optional[int]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Search only the given vector ids, at a cost proportional to their
+        number. Caller holds the lock, so the ids agree with the index.
+        """
+        if len(vector_ids) <= FILTER_EXACT_SEARCH_MAX:
+            # small subsets are scored exactly against just their stored vectors
+            return exact_top_k(query_embeddings, self.get_vectors(vector_ids), vector_ids, top_k)
+
+        selector = faiss.IDSelectorBatch(vector_ids)
+
+        return self._search_index(query_embeddings, top_k, nprobe, ef_search, selector)
+
+    def _search_index(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int,
+        nprobe: Optional[int],
+        ef_search: Optional[int],
+        selector: Optional[faiss.IDSelector]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        FAISS search. With rescore, a compressed index fetches a larger
+        shortlist whose exact float32 scores, read from the segments, pick
+        the top-k. Caller holds the lock.
+        """
+        params = search_parameters(self.index_type, nprobe, ef_search, selector, self.index_storage)
+
+        if not (self.rescore and is_compressed(self.index_type, self.index_storage)):
+            return self.index.search(query_embeddings, top_k, params=params)
+
+        _, shortlist = self.index.search(
+            query_embeddings, rescore_candidates(self.index_type, self.index_storage, top_k), params=params
+        )
+
+        candidates = np.unique(shortlist[shortlist != -1])
+        vectors = self.get_vectors(candidates)
+
+        scores = np.full((len(query_embeddings), top_k), -np.inf, dtype=np.float32)
+        indices = np.full((len(query_embeddings), top_k), -1, dtype=np.int64)
+        for row, (query, row_ids) in enumerate(zip(query_embeddings, shortlist)):
+            row_ids = row_ids[row_ids != -1]
+            row_scores, row_indices = exact_top_k(
+                query[None, :], vectors[np.searchsorted(candidates, row_ids)], row_ids, top_k
+            )
+            scores[row], indices[row] = row_scores[0], row_indices[0]
+
+        return scores, indices
+
+    def _search_lexical(self, query: str, top_k: int, allowed: Optional[np.ndarray]) -> np.ndarray:
+        """
+        BM25 top-k vector ids over all segments. Caller holds the lock.
+        """
+        segments = []
+        offset = 0
+        for seg in self.segments:
+            segments.append((self._lexical[seg["name"]], self._ids[offset:offset + seg["count"]]))
+            offset += seg["count"]
+
+        ids, _ = bm25_search(segments, query, top_k, allowed=allowed, excluded=self._tombstones)
+
+        return ids
+
+    def configure_storage(self, storage: str, rescore: Optional[bool] = None) -> None:
+        """
+        Change how the in-memory index encodes vectors. The index is
+        re-encoded from the float32 segments in the background.
+        """
+        validate_storage(storage)
+        # a PQ_M that does not divide the dimension fails here, not in the rebuild
+        storage_factory_string(storage, self.embedding_dim)
+
+        with self._lock:
+            self.storage = storage
+            if rescore is not None:
+                self.rescore = rescore
+            self._write_manifest()
+
+        logger.info(f"Storage configured | storage={storage} | rescore={self.rescore}")
+        if storage == "pq" and not self.rescore:
+            # see PQ_RESCORE_CANDIDATES_MULTIPLIER in app.config for the measured recall
+            logger.warning("PQ storage without re-scoring has low recall | storage=pq | rescore=False")
+
+        self._maybe_rebuild()
+
+    def find_embeddings(self, content_hashes: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Stored vectors of already indexed chunks, keyed by chunk content hash.
+        """
+        # under the lock, committed metadata rows and the segment list agree
+        with self._lock:
+            vector_ids = self.metadata.vector_ids_for_hashes(content_hashes)
+            if not vector_ids:
+                return {}
+
+            vectors = self.get_vectors(list(vector_ids.values()))
+
+        return dict(zip(vector_ids.keys(), vectors))
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        filters: Optional[Dict] = None,
+        query_text: Optional[str] = None
+    ) -> List[Dict]:
         """
         Perform similarity search and return top-k results with scores.
+        nprobe / ef_search tune recall vs latency for IVF / HNSW indexes.
         """
 
-        if self.index.ntotal == 0:
-            raise ValueError("FAISS index is empty")
-        
         if query_embedding.ndim != 2:
             raise ValueError("Query embedding must be 2D")
-        
-        scores, indices = self.index.search(query_embedding, top_k)
+
+        return self.search_batch(
+            query_embedding[:1],
+            top_k,
+            nprobe=nprobe,
+            ef_search=ef_search,
+            filters=filters,
+            query_texts=[query_text] if query_text is not None else None
+        )[0]
+
+    def search_batch(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        filters: Optional[Dict] = None,
+        query_texts: Optional[List[str]] = None
+    ) -> List[List[Dict]]:
+        """
+        Search many queries with one multi-row FAISS call and one metadata lookup.
+        Returns one top-k result list per query row, in input order.
+
+        `filters` (keyword arguments of ChunkMetadataStore.filter_vector_ids)
+        restricts the search to matching chunks. With `query_texts` and
+        HYBRID_SEARCH, BM25 hits are fused in and scores are fused RRF scores.
+        """
+
+        if self.live_vectors == 0:
+            raise ValueError("FAISS index is empty")
+
+        if query_embeddings.ndim != 2:
+            raise ValueError("Query embedding must be 2D")
+
+        with self._lock:
+            allowed = None
+            if filters:
+                # deleted chunks have no metadata rows, so the matches are all live
+                allowed = np.array(self.metadata.filter_vector_ids(**filters), dtype=np.int64)
+                scores, indices = self._search_filtered(query_embeddings, top_k, allowed, nprobe, ef_search)
+            else:
+                scores, indices = self._search_index(
+                    query_embeddings, top_k, nprobe, ef_search, self._search_selector
+                )
+
+            lexical = (
+                [self._search_lexical(text, top_k, allowed) for text in query_texts]
+                if query_texts is not None and HYBRID_SEARCH else None
+            )
+
+        # only the returned hits are read from the metadata store
+        if lexical is None:
+            hits = [
+                [(int(idx), float(score)) for score, idx in zip(row_scores, row_indices) if idx != -1]
+                for row_scores, row_indices in zip(scores, indices)
+            ]
+        else:
+            # fused by rank, so cosine and BM25 score scales never mix
+            hits = [
+                reciprocal_rank_fusion([row_indices[row_indices != -1], lexical_ids], top_k)
+                for row_indices, lexical_ids in zip(indices, lexical)
+            ]
+        chunks = self.metadata.get({idx for row in hits for idx, _ in row})
 
         results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx == -1:
-                continue
-            
-            item = self.metadata[idx].copy()
-            item["score"] = float(score)
-            results.append(item)
+        for row in hits:
+            row_results = []
+            for idx, score in row:
+                # deleted between the search and the metadata lookup
+                if idx not in chunks:
+                    continue
 
-        logger.info(f"FAISS search completed | returned={len(results)}")
+                item = dict(chunks[idx])
+                item["vector_id"] = idx
+                item["score"] = score
+                row_results.append(item)
+            results.append(row_results)
+
+        logger.info(
+            f"FAISS search completed | queries={len(results)} | returned={sum(len(r) for r in results)}"
+        )
 
-        return results
\ No newline at end of file
+        return results
@@ -0,0 +1,214 @@
+from typing import Optional
+import math
+import faiss
+import numpy as np
+
+from app.config import (
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    HNSW_M,
+    IVF_NLIST,
+    IVF_NPROBE,
+    PQ_M,
+    PQ_RESCORE_CANDIDATES_MULTIPLIER,
+    RESCORE_CANDIDATES_MULTIPLIER,
+)
+from app.logger import get_logger
+
+logger = get_logger()
+
+INDEX_TYPES = {"flat", "ivf_flat", "hnsw", "ivf_pq"}
+
+# how vectors are encoded inside flat, ivf_flat and hnsw indexes (ivf_pq always stores PQ codes)
+STORAGE_MODES = {"float32", "fp16", "sq8", "pq"}
+
+# k-means wants roughly this many training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+
+def ivf_nlist(ntotal: int) -> int:
+    """
+    Number of IVF lists for a corpus size (~4 * sqrt(n), capped by what can be trained).
+    """
+    if IVF_NLIST:
+        return IVF_NLIST
+
+    return max(1, min(int(4 * math.sqrt(ntotal)), ntotal // MIN_POINTS_PER_CENTROID))
+
+
+def validate_storage(storage: str) -> None:
+    if storage not in STORAGE_MODES:
+        raise ValueError(f"Unsupported storage mode: {storage}. Expected one of {sorted(STORAGE_MODES)}")
+
+
+def storage_needs_training(storage: str) -> bool:
+    return storage in ("sq8", "pq")
+
+
+def is_compressed(index_type: str, storage: str) -> bool:
+    """
+    True when the index scores approximate (encoded) vectors rather than float32 ones.
+    """
+    return index_type == "ivf_pq" or storage != "float32"
+
+
+def rescore_candidates(index_type: str, storage: str, top_k: int) -> int:
+    """
+    Shortlist size to re-score exactly for `top_k` hits; PQ codes need a longer one.
+    """
+    if index_type == "ivf_pq" or storage == "pq":
+        return top_k * PQ_RESCORE_CANDIDATES_MULTIPLIER
+
+    return top_k * RESCORE_CANDIDATES_MULTIPLIER
+
+
+def uses_ivf(index_type: str, storage: str) -> bool:
+    # IndexPQ cannot take an ID selector, so flat PQ is built as a single inverted list
+    return index_type in ("ivf_flat", "ivf_pq") or (index_type == "flat" and storage == "pq")
+
+
+def pq_factory_string(embedding_dim: int) -> str:
+    if embedding_dim % PQ_M != 0:
+        raise ValueError(f"PQ_M={PQ_M} must divide the embedding dimension {embedding_dim}")
+
+    return f"PQ{PQ_M}"
+
+
+def storage_factory_string(storage: str, embedding_dim: int) -> str:
+    validate_storage(storage)
+
+    if storage == "fp16":
+        return "SQfp16"
+
+    if storage == "sq8":
+        return "SQ8"
+
+    if storage == "pq":
+        return pq_factory_string(embedding_dim)
+
+    return "Flat"
+
+
+def index_factory_string(index_type: str, embedding_dim: int, ntotal: int, storage: str = "float32") -> str:
+    encoding = storage_factory_string(storage, embedding_dim)
+
+    if index_type == "flat":
+        return f"IVF1,{encoding}" if uses_ivf(index_type, storage) else encoding
+
+    if index_type == "ivf_flat":
+        return f"IVF{ivf_nlist(ntotal)},{encoding}"
+
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_M},{encoding}"
+
+    if index_type == "ivf_pq":
+        return f"IVF{ivf_nlist(ntotal)},{pq_factory_string(embedding_dim)}"
+
+    raise ValueError(f"Unsupported index type: {index_type}. Expected one of {sorted(INDEX_TYPES)}")
+
+
+def build_index(index_type: str, embedding_dim: int, ntotal: int = 0, storage: str = "float32") -> faiss.Index:
+    """
+    Create an empty inner-product index of the given type and storage mode
+    sized for ntotal vectors.
+    """
+    description = index_factory_string(index_type, embedding_dim, ntotal, storage)
+    index = faiss.index_factory(embedding_dim, description, faiss.METRIC_INNER_PRODUCT)
+
+    if index_type == "hnsw":
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+
+    logger.info(f"Built FAISS index | type={index_type} | factory={description}")
+
+    return index
+
+
+def train_index(index: faiss.Index, sample: np.ndarray) -> None:
+    """
+    Train quantizers on a sample of the corpus. No-op for indexes that need no training.
+    """
+    if index.is_trained:
+        return
+
+    logger.info(f"Training FAISS index | sample_size={sample.shape[0]}")
+    index.train(np.ascontiguousarray(sample, dtype=np.float32))
+
+
+def index_type_of(index: faiss.Index) -> str:
+    """
+    Recover the index type of a deserialized index.
+    """
+    index = faiss.downcast_index(index)
+
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        index = faiss.downcast_index(index.index)
+
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+
+    return "flat"
+
+
+def code_bytes(storage: str, embedding_dim: int) -> int:
+    """
+    Size of one encoded vector.
+    """
+    if storage == "fp16":
+        return embedding_dim * 2
+
+    if storage == "sq8":
+        return embedding_dim
+
+    if storage == "pq":
+        return PQ_M
+
+    return embedding_dim * 4
+
+
+def index_memory_bytes(index_type: str, embedding_dim: int, ntotal: int, storage: str = "float32") -> int:
+    """
+    Approximate resident size of an index holding ntotal vectors.
+    """
+    codes = code_bytes(storage, embedding_dim)
+
+    if index_type == "hnsw":
+        # encoded vectors plus ~2*M int32 neighbour links per vector on level 0
+        return ntotal * (codes + 2 * HNSW_M * 4)
+
+    if index_type == "ivf_pq":
+        return ntotal * (PQ_M + 8)
+
+    if uses_ivf(index_type, storage):
+        # encoded vectors plus an int64 id per inverted list entry
+        return ntotal * (codes + 8)
+
+    return ntotal * codes
+
+
+def search_parameters(
+    index_type: str,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    selector: Optional[faiss.IDSelector] = None,
+    storage: str = "float32"
+) -> Optional[faiss.SearchParameters]:
+    """
+    Per-query search knobs: nprobe for IVF indexes, efSearch for HNSW.
+    A selector restricts the search to the ids it accepts.
+    """
+    if uses_ivf(index_type, storage):
+        return faiss.SearchParametersIVF(nprobe=nprobe or IVF_NPROBE, sel=selector)
+
+    if index_type == "hnsw":
+        return faiss.SearchParametersHNSW(efSearch=ef_search or HNSW_EF_SEARCH, sel=selector)
+
+    if selector is not None:
+        return faiss.SearchParameters(sel=selector)
+
+    return None
@@ -0,0 +1,281 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+import os
+import re
+import numpy as np
+
+from app.config import BM25_B, BM25_K1, RRF_K
+
+# word characters joined by . _ - / : form one identifier (clause 4.2.1, ERR_TIMEOUT, E-0042)
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:[._\-/:][^\W_]+)*")
+PART_PATTERN = re.compile(r"[^\W_]+")
+
+# longer tokens are almost always encoded blobs; they would only bloat the term arrays
+MAX_TOKEN_LENGTH = 64
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased word tokens for BM25. Identifiers are kept whole and also
+    split into their parts, so "4.2" matches both "clause 4.2" and "4".
+    """
+    tokens = []
+
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        if len(token) > MAX_TOKEN_LENGTH:
+            continue
+
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(PART_PATTERN.findall(token))
+
+    return tokens
+
+
+class LexicalSegment:
+    """
+    BM25 postings of one vector segment in compressed sparse row form:
+    the postings of terms[i] are rows[offsets[i]:offsets[i + 1]] (row
+    positions within the segment, ascending) with term frequencies in tfs.
+    lengths holds the token count of every row.
+    """
+
+    def __init__(
+        self,
+        terms: np.ndarray,
+        offsets: np.ndarray,
+        rows: np.ndarray,
+        tfs: np.ndarray,
+        lengths: np.ndarray
+    ):
+        self.terms = terms
+        self.offsets = offsets
+        self.rows = rows
+        self.tfs = tfs
+        self.lengths = lengths
+        self.total_length = int(lengths.sum())
+
+    @classmethod
+    def from_postings(
+        cls,
+        terms: np.ndarray,
+        term_ids: np.ndarray,
+        rows: np.ndarray,
+        tfs: np.ndarray,
+        lengths: np.ndarray
+    ) -> "LexicalSegment":
+        """
+        Group unordered (term_ids, rows, tfs) postings over the vocabulary
+        `terms` by term, dropping terms without postings.
+        """
+        order = np.lexsort((rows, term_ids))
+        term_ids = term_ids[order]
+
+        used, counts = np.unique(term_ids, return_counts=True)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        return cls(
+            terms[used],
+            offsets,
+            rows[order].astype(np.int32),
+            tfs[order].astype(np.int32),
+            lengths.astype(np.int32)
+        )
+
+    @classmethod
+    def merge(cls, segments: List["LexicalSegment"]) -> "LexicalSegment":
+        """
+        Postings of the concatenation of the given segments, in order.
+        """
+        terms = np.unique(np.concatenate([seg.terms for seg in segments]))
+
+        term_ids, rows, tfs = [], [], []
+        row_offset = 0
+        for seg in segments:
+            mapping = np.searchsorted(terms, seg.terms)
+            term_ids.append(np.repeat(mapping, np.diff(seg.offsets)))
+            rows.append(seg.rows.astype(np.int64) + row_offset)
+            tfs.append(seg.tfs)
+            row_offset += len(seg.lengths)
+
+        return cls.from_postings(
+            terms,
+            np.concatenate(term_ids),
+            np.concatenate(rows),
+            np.concatenate(tfs),
+            np.concatenate([seg.lengths for seg in segments])
+        )
+
+    def filter(self, keep: np.ndarray) -> "LexicalSegment":
+        """
+        Postings of the rows selected by the boolean mask `keep`, renumbered.
+        """
+        new_rows = np.cumsum(keep) - 1
+        term_ids = np.repeat(np.arange(len(self.terms)), np.diff(self.offsets))
+        kept = keep[self.rows]
+
+        return LexicalSegment.from_postings(
+            self.terms,
+            term_ids[kept],
+            new_rows[self.rows[kept]],
+            self.tfs[kept],
+            self.lengths[keep]
+        )
+
+    def postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        i = int(np.searchsorted(self.terms, term))
+        if i == len(self.terms) or self.terms[i] != term:
+            return None
+
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.rows[start:end], self.tfs[start:end]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.terms, self.offsets, self.rows, self.tfs, self.lengths))
+
+    def save(self, path: str) -> None:
+        """
+        Durably write the segment's postings next to its vectors.
+        """
+        with open(path + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                terms=self.terms,
+                offsets=self.offsets,
+                rows=self.rows,
+                tfs=self.tfs,
+                lengths=self.lengths
+            )
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalSegment":
+        with np.load(path) as data:
+            return cls(data["terms"], data["offsets"], data["rows"], data["tfs"], data["lengths"])
+
+
+class LexicalSegmentBuilder:
+    """
+    Accumulates postings while a segment is written, one row per chunk.
+    """
+
+    def __init__(self):
+        self._terms: List[str] = []
+        self._rows: List[int] = []
+        self._tfs: List[int] = []
+        self._lengths: List[int] = []
+
+    def add(self, texts: Iterable[str]) -> None:
+        for text in texts:
+            tokens = tokenize(text)
+            row = len(self._lengths)
+
+            for term, tf in Counter(tokens).items():
+                self._terms.append(term)
+                self._rows.append(row)
+                self._tfs.append(tf)
+
+            self._lengths.append(len(tokens))
+
+    def build(self) -> LexicalSegment:
+        terms, term_ids = np.unique(np.array(self._terms, dtype=str), return_inverse=True)
+
+        return LexicalSegment.from_postings(
+            terms,
+            term_ids,
+            np.array(self._rows, dtype=np.int64),
+            np.array(self._tfs, dtype=np.int32),
+            np.array(self._lengths, dtype=np.int32)
+        )
+
+
+def bm25_search(
+    segments: List[Tuple[LexicalSegment, np.ndarray]],
+    query: str,
+    top_k: int,
+    allowed: Optional[np.ndarray] = None,
+    excluded: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    BM25 top-k over (segment, vector ids of its rows) pairs. Work is
+    proportional to the postings of the query terms, not the corpus.
+    Returns (vector ids, scores), best first.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    num_docs = sum(len(seg.lengths) for seg, _ in segments)
+
+    if not terms or not num_docs:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    average_length = max(1.0, sum(seg.total_length for seg, _ in segments) / num_docs)
+
+    postings = [[seg.postings(term) for term in terms] for seg, _ in segments]
+    document_frequency = [
+        sum(len(hits[t][0]) for hits in postings if hits[t] is not None)
+        for t in range(len(terms))
+    ]
+    idf = [math.log(1 + (num_docs - df + 0.5) / (df + 0.5)) for df in document_frequency]
+
+    ids, scores = [], []
+    for (seg, segment_ids), hits in zip(segments, postings):
+        rows, contributions = [], []
+
+        for weight, hit in zip(idf, hits):
+            if hit is None:
+                continue
+
+            term_rows, tfs = hit
+            tfs = tfs.astype(np.float32)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * seg.lengths[term_rows] / average_length)
+
+            rows.append(term_rows)
+            contributions.append(weight * tfs * (BM25_K1 + 1) / (tfs + norm))
+
+        if not rows:
+            continue
+
+        unique_rows, inverse = np.unique(np.concatenate(rows), return_inverse=True)
+        ids.append(segment_ids[unique_rows])
+        scores.append(np.bincount(inverse, weights=np.concatenate(contributions)))
+
+    if not ids:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    ids = np.concatenate(ids)
+    scores = np.concatenate(scores).astype(np.float32)
+
+    keep = np.ones(len(ids), dtype=bool)
+    if excluded is not None and len(excluded):
+        keep &= ~np.isin(ids, excluded)
+    if allowed is not None:
+        keep &= np.isin(ids, allowed)
+    ids, scores = ids[keep], scores[keep]
+
+    if len(ids) > top_k:
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        ids, scores = ids[top], scores[top]
+
+    order = np.argsort(-scores, kind="stable")
+
+    return ids[order], scores[order]
+
+
+def reciprocal_rank_fusion(rankings: List[np.ndarray], top_k: int) -> List[Tuple[int, float]]:
+    """
+    Fuse ranked id lists by summing 1 / (RRF_K + rank). Returns the top_k
+    (id, fused score) pairs, best first.
+    """
+    fused: Dict[int, float] = {}
+
+    for ranking in rankings:
+        for rank, vector_id in enumerate(ranking):
+            vector_id = int(vector_id)
+            fused[vector_id] = fused.get(vector_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
@@ -0,0 +1,442 @@
+from typing import Dict, Iterable, List, Optional
+import os
+import json
+import sqlite3
+import threading
+import time
+
+from app.config import METADATA_MMAP_BYTES
+from app.logger import get_logger
+
+logger = get_logger()
+
+METADATA_DB_FILE = "chunks.sqlite3"
+
+# fields stored in their own columns; anything else goes into the `extra` JSON
+CHUNK_COLUMNS = [
+    "chunk_id", "doc_id", "text", "start_char_pos", "end_char_pos", "token_count", "content_hash",
+    "file_name", "page_start", "page_end", "uploaded_at",
+]
+
+# columns added after the first release; stores created before then gain them on open
+ADDED_COLUMNS = {
+    "token_count": "INTEGER",
+    "content_hash": "TEXT",
+    "file_name": "TEXT",
+    "page_start": "INTEGER",
+    "page_end": "INTEGER",
+    "uploaded_at": "REAL",
+}
+
+
+class ChunkMetadataStore:
+    """
+    Chunk metadata in an embedded SQLite table keyed by FAISS vector id.
+
+    Opening the store is O(1): nothing is read into Python objects up front,
+    and chunk text is fetched only for the vector ids a search returns.
+    Rows are written while a segment is being built and receive their
+    vector ids when the segment is committed.
+
+    Deleting or replacing a document removes its rows and records their
+    vector ids as tombstones until the vectors are purged from the segments.
+    """
+
+    def __init__(self, storage_dir: str):
+        os.makedirs(storage_dir, exist_ok=True)
+
+        self.path = os.path.join(storage_dir, METADATA_DB_FILE)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=FULL")
+            self._conn.execute(f"PRAGMA mmap_size={METADATA_MMAP_BYTES}")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    vector_id INTEGER UNIQUE,
+                    segment TEXT NOT NULL,
+                    segment_row INTEGER NOT NULL,
+                    chunk_id INTEGER,
+                    doc_id TEXT,
+                    text TEXT NOT NULL,
+                    start_char_pos INTEGER,
+                    end_char_pos INTEGER,
+                    token_count INTEGER,
+                    content_hash TEXT,
+                    file_name TEXT,
+                    page_start INTEGER,
+                    page_end INTEGER,
+                    uploaded_at REAL,
+                    extra TEXT
+                )
+                """
+            )
+
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")}
+            added = [column for column in ADDED_COLUMNS if column not in existing]
+            for column in added:
+                self._conn.execute(f"ALTER TABLE chunks ADD COLUMN {column} {ADDED_COLUMNS[column]}")
+
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chunks_content_hash ON chunks (content_hash)"
+            )
+            # one row per ingested file, keyed by the hash of its bytes; staged
+            # with its segment and committed together with the segment's chunks
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    content_hash TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    file_name TEXT,
+                    segment TEXT NOT NULL,
+                    chunk_count INTEGER NOT NULL,
+                    ingested_at REAL NOT NULL,
+                    committed INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents (content_hash)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chunks_segment ON chunks (segment)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chunks_doc_id ON chunks (doc_id)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_documents_doc_id ON documents (doc_id)"
+            )
+            # vector ids of deleted chunks still present in the segment files
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tombstones (vector_id INTEGER PRIMARY KEY)"
+            )
+            # filterable chunk fields; doc_id is indexed above
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chunks_file_name ON chunks (file_name)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chunks_uploaded_at ON chunks (uploaded_at)"
+            )
+
+            if "file_name" in added:
+                # older chunks take the file name and ingest time of their document
+                self._conn.execute(
+                    """
+                    UPDATE chunks SET
+                        file_name = (SELECT file_name FROM documents WHERE documents.doc_id = chunks.doc_id),
+                        uploaded_at = (SELECT ingested_at FROM documents WHERE documents.doc_id = chunks.doc_id)
+                    """
+                )
+
+    def insert(self, segment: str, first_row: int, metadata: List[Dict]) -> None:
+        """
+        Stage metadata rows for an uncommitted segment.
+        """
+        rows = []
+        for offset, item in enumerate(metadata):
+            extra = {k: v for k, v in item.items() if k not in CHUNK_COLUMNS}
+            rows.append((
+                segment,
+                first_row + offset,
+                *(item.get(column) for column in CHUNK_COLUMNS),
+                json.dumps(extra) if extra else None,
+            ))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"""
+                INSERT INTO chunks (segment, segment_row, {", ".join(CHUNK_COLUMNS)}, extra)
+                VALUES (?, ?, {", ".join("?" for _ in CHUNK_COLUMNS)}, ?)
+                """,
+                rows,
+            )
+
+    def stage_document(
+        self,
+        segment: str,
+        content_hash: str,
+        doc_id: str,
+        file_name: str,
+        chunk_count: int
+    ) -> None:
+        """
+        Record the document a segment holds; it becomes visible when the segment commits.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO documents (content_hash, doc_id, file_name, segment, chunk_count, ingested_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (content_hash, doc_id, file_name, segment, chunk_count, time.time()),
+            )
+
+    def assign_vector_ids(self, segment: str, first_vector_id: int) -> List[int]:
+        """
+        Publish a segment's rows under the vector ids its vectors received in FAISS.
+        A document committed under an existing doc_id replaces the previous
+        version, whose vector ids are tombstoned and returned.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE chunks SET vector_id = ? + segment_row WHERE segment = ?",
+                (first_vector_id, segment),
+            )
+
+            doc_ids = [
+                row[0] for row in self._conn.execute(
+                    "SELECT doc_id FROM documents WHERE segment = ? AND committed = 0",
+                    (segment,),
+                )
+            ]
+            superseded = []
+            for doc_id in doc_ids:
+                superseded.extend(self._remove_document(doc_id, exclude_segment=segment))
+
+            self._conn.execute(
+                "UPDATE documents SET committed = 1 WHERE segment = ?",
+                (segment,),
+            )
+
+        return superseded
+
+    def delete_document(self, doc_id: str) -> Optional[List[int]]:
+        """
+        Remove a committed document's rows and tombstone its vector ids.
+        Returns the tombstoned ids, or None if no such document exists.
+        """
+        with self._lock, self._conn:
+            exists = self._conn.execute(
+                "SELECT 1 FROM documents WHERE doc_id = ? AND committed = 1",
+                (doc_id,),
+            ).fetchone()
+
+            if exists is None:
+                return None
+
+            return self._remove_document(doc_id)
+
+    def _remove_document(self, doc_id: str, exclude_segment: Optional[str] = None) -> List[int]:
+        # caller holds the lock and the transaction
+        vector_ids = [
+            row[0] for row in self._conn.execute(
+                """
+                SELECT vector_id FROM chunks
+                WHERE doc_id = ? AND vector_id IS NOT NULL AND segment IS NOT ?
+                """,
+                (doc_id, exclude_segment),
+            )
+        ]
+
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO tombstones (vector_id) VALUES (?)",
+            [(vector_id,) for vector_id in vector_ids],
+        )
+        self._conn.execute(
+            "DELETE FROM chunks WHERE doc_id = ? AND vector_id IS NOT NULL AND segment IS NOT ?",
+            (doc_id, exclude_segment),
+        )
+        self._conn.execute(
+            "DELETE FROM documents WHERE doc_id = ? AND committed = 1",
+            (doc_id,),
+        )
+
+        return vector_ids
+
+    def tombstones(self) -> List[int]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT vector_id FROM tombstones")]
+
+    def remove_tombstones(self, vector_ids: Iterable[int]) -> None:
+        """
+        Forget tombstones whose vectors have been purged from the segments.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM tombstones WHERE vector_id = ?",
+                [(int(vector_id),) for vector_id in vector_ids],
+            )
+
+    def discard_segment(self, segment: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM chunks WHERE segment = ? AND vector_id IS NULL",
+                (segment,),
+            )
+            self._conn.execute(
+                "DELETE FROM documents WHERE segment = ? AND committed = 0",
+                (segment,),
+            )
+
+    def uncommitted_segments(self) -> List[str]:
+        """
+        Segments with rows or documents still waiting for their commit.
+        """
+        with self._lock:
+            return [
+                row[0] for row in self._conn.execute(
+                    """
+                    SELECT segment FROM chunks WHERE vector_id IS NULL
+                    UNION
+                    SELECT segment FROM documents WHERE committed = 0
+                    """
+                )
+            ]
+
+    def discard_uncommitted(self, next_vector_id: int) -> int:
+        """
+        Drop rows that never made it into the manifest (crashed writers).
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM chunks WHERE vector_id IS NULL OR vector_id >= ?",
+                (next_vector_id,),
+            )
+            self._conn.execute("DELETE FROM documents WHERE committed = 0")
+
+        if cursor.rowcount:
+            logger.warning(f"Discarded uncommitted metadata rows | count={cursor.rowcount}")
+
+        return cursor.rowcount
+
+    def get(self, vector_ids: Iterable[int]) -> Dict[int, Dict]:
+        """
+        Fetch metadata for the given vector ids.
+        """
+        vector_ids = [int(vector_id) for vector_id in vector_ids]
+        if not vector_ids:
+            return {}
+
+        placeholders = ", ".join("?" for _ in vector_ids)
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT vector_id, {", ".join(CHUNK_COLUMNS)}, extra
+                FROM chunks WHERE vector_id IN ({placeholders})
+                """,
+                vector_ids,
+            ).fetchall()
+
+        results = {}
+        for row in rows:
+            item = dict(zip(CHUNK_COLUMNS, row[1:-1]))
+            if row[-1]:
+                item.update(json.loads(row[-1]))
+            results[row[0]] = item
+
+        return results
+
+    def find_document(self, content_hash: str) -> Optional[Dict]:
+        """
+        The committed document with these file bytes, if any.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT doc_id, file_name, chunk_count, ingested_at FROM documents
+                WHERE content_hash = ? AND committed = 1
+                ORDER BY ingested_at LIMIT 1
+                """,
+                (content_hash,),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return dict(zip(["doc_id", "file_name", "chunk_count", "ingested_at"], row))
+
+    def get_document(self, doc_id: str) -> Optional[Dict]:
+        """
+        The committed document with this id, if any.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT doc_id, file_name, chunk_count, ingested_at, content_hash FROM documents
+                WHERE doc_id = ? AND committed = 1
+                """,
+                (doc_id,),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return dict(zip(["doc_id", "file_name", "chunk_count", "ingested_at", "content_hash"], row))
+
+    def vector_ids_for_hashes(self, content_hashes: Iterable[str]) -> Dict[str, int]:
+        """
+        One committed vector id per chunk content hash that is already indexed.
+        """
+        content_hashes = list(content_hashes)
+        if not content_hashes:
+            return {}
+
+        placeholders = ", ".join("?" for _ in content_hashes)
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT content_hash, MIN(vector_id) FROM chunks
+                WHERE content_hash IN ({placeholders}) AND vector_id IS NOT NULL
+                GROUP BY content_hash
+                """,
+                content_hashes,
+            ).fetchall()
+
+        return dict(rows)
+
+    def filter_vector_ids(
+        self,
+        doc_ids: Optional[List[str]] = None,
+        file_names: Optional[List[str]] = None,
+        page_from: Optional[int] = None,
+        page_to: Optional[int] = None,
+        uploaded_after: Optional[float] = None,
+        uploaded_before: Optional[float] = None
+    ) -> List[int]:
+        """
+        Committed vector ids, ascending, of the chunks matching every given
+        condition. A chunk matches a page range if any of its pages fall in it.
+        """
+        conditions = ["vector_id IS NOT NULL"]
+        params: List = []
+
+        for column, values in (("doc_id", doc_ids), ("file_name", file_names)):
+            if values is not None:
+                if not values:
+                    return []
+                conditions.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+
+        for condition, value in (
+            ("page_end >= ?", page_from),
+            ("page_start <= ?", page_to),
+            ("uploaded_at >= ?", uploaded_after),
+            ("uploaded_at <= ?", uploaded_before),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+
+        with self._lock:
+            return [
+                row[0] for row in self._conn.execute(
+                    f"SELECT vector_id FROM chunks WHERE {' AND '.join(conditions)} ORDER BY vector_id",
+                    params,
+                )
+            ]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM chunks WHERE vector_id IS NOT NULL"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
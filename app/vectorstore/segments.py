@@ -0,0 +1,287 @@
+from typing import Dict, Iterator, List, Optional
+import os
+import json
+import shutil
+import numpy as np
+
+from app.logger import get_logger
+from app.vectorstore.lexical_index import LexicalSegmentBuilder
+
+logger = get_logger()
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_SUFFIX = ".vec"  # raw float32 rows, row-major
+IDS_SUFFIX = ".ids"  # int64 vector id of each row, ascending
+LEXICAL_SUFFIX = ".lex"  # BM25 postings of the segment's rows (npz)
+SEGMENT_SUFFIXES = (VECTORS_SUFFIX, IDS_SUFFIX, LEXICAL_SUFFIX)
+SNAPSHOT_SUFFIX = ".faiss"  # serialized trained index covering the first `ntotal` vectors
+TMP_SUFFIX = ".tmp"
+
+
+def fsync_dir(path: str) -> None:
+    """
+    Persist directory entries (renames, new files) to disk.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_json(path: str, data: Dict) -> None:
+    """
+    Write JSON so that readers see either the old or the new file, never a torn one.
+    """
+    tmp_path = path + TMP_SUFFIX
+
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+    fsync_dir(os.path.dirname(path) or ".")
+
+
+def read_manifest(storage_dir: str) -> Optional[Dict]:
+    path = os.path.join(storage_dir, MANIFEST_FILE)
+
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_manifest(storage_dir: str, manifest: Dict) -> None:
+    atomic_write_json(os.path.join(storage_dir, MANIFEST_FILE), manifest)
+
+
+def segment_path(storage_dir: str, name: str) -> str:
+    return os.path.join(storage_dir, name + VECTORS_SUFFIX)
+
+
+def ids_path(storage_dir: str, name: str) -> str:
+    return os.path.join(storage_dir, name + IDS_SUFFIX)
+
+
+def lexical_path(storage_dir: str, name: str) -> str:
+    return os.path.join(storage_dir, name + LEXICAL_SUFFIX)
+
+
+def remove_segment_files(storage_dir: str, name: str) -> None:
+    for suffix in SEGMENT_SUFFIXES:
+        path = os.path.join(storage_dir, name + suffix)
+        for candidate in (path, path + TMP_SUFFIX):
+            if os.path.exists(candidate):
+                os.remove(candidate)
+
+
+def snapshot_path(storage_dir: str, name: str) -> str:
+    return os.path.join(storage_dir, name + SNAPSHOT_SUFFIX)
+
+
+def remove_orphan_files(
+    storage_dir: str,
+    live_segments: List[str],
+    live_snapshot: Optional[str] = None
+) -> None:
+    """
+    Delete segment and index snapshot files not referenced by the manifest,
+    left behind by crashed writers, compactions or index rebuilds.
+    """
+    live_files = {name + suffix for name in live_segments for suffix in SEGMENT_SUFFIXES}
+    if live_snapshot:
+        live_files.add(live_snapshot + SNAPSHOT_SUFFIX)
+
+    for file_name in os.listdir(storage_dir):
+        if not file_name.startswith(("seg-", "index-")) or file_name in live_files:
+            continue
+
+        logger.warning(f"Removing orphan segment file | file={file_name}")
+        os.remove(os.path.join(storage_dir, file_name))
+
+
+def open_segment_vectors(storage_dir: str, name: str, embedding_dim: int) -> np.ndarray:
+    """
+    Memory-map a segment's vectors as a read-only (rows, embedding_dim) array.
+    """
+    path = segment_path(storage_dir, name)
+
+    if os.path.getsize(path) == 0:
+        return np.empty((0, embedding_dim), dtype=np.float32)
+
+    return np.memmap(path, dtype=np.float32, mode="r").reshape(-1, embedding_dim)
+
+
+def write_segment_ids(storage_dir: str, name: str, ids: np.ndarray) -> None:
+    """
+    Durably write the vector ids of a segment's rows.
+    """
+    path = ids_path(storage_dir, name)
+
+    with open(path + TMP_SUFFIX, "wb") as f:
+        f.write(np.ascontiguousarray(ids, dtype=np.int64).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(path + TMP_SUFFIX, path)
+
+
+def read_segment_ids(storage_dir: str, name: str) -> Optional[np.ndarray]:
+    """
+    A segment's vector ids, or None for segments written before ids were stored.
+    """
+    path = ids_path(storage_dir, name)
+
+    if not os.path.exists(path):
+        return None
+
+    return np.fromfile(path, dtype=np.int64)
+
+
+def iter_segment_vectors(
+    storage_dir: str,
+    name: str,
+    embedding_dim: int,
+    batch_size: int,
+    start_row: int = 0
+) -> Iterator[np.ndarray]:
+    """
+    Yield a segment's vectors in batches from a memory map,
+    so loading never materializes a whole segment at once.
+    """
+    vectors = open_segment_vectors(storage_dir, name, embedding_dim)
+
+    for start in range(start_row, vectors.shape[0], batch_size):
+        yield np.ascontiguousarray(vectors[start:start + batch_size])
+
+
+class SegmentWriter:
+    """
+    Appends one ingest's vectors to a new segment file and stages its
+    metadata rows. Vectors are written under a temporary name and only
+    become part of the index when the store commits the segment into its manifest.
+    BM25 postings of the chunk texts are collected alongside.
+    """
+
+    def __init__(self, store, name: str):
+        self.store = store
+        self.name = name
+        self.count = 0
+
+        self._path = segment_path(store.storage_dir, name)
+        self._vectors_file = open(self._path + TMP_SUFFIX, "wb")
+        self._closed = False
+        self._lexical = LexicalSegmentBuilder()
+
+    def add(self, embeddings: np.ndarray, metadata: List[Dict]) -> None:
+        """
+        Append a batch of embeddings and their metadata to the segment.
+        """
+
+        if embeddings.ndim != 2:
+            raise ValueError("Embedding must be a 2D array")
+
+        if embeddings.shape[0] != len(metadata):
+            raise ValueError("Embeddings count does not match metadata count")
+
+        if embeddings.shape[1] != self.store.embedding_dim:
+            raise ValueError("Embedding dimension does not match the index")
+
+        self._vectors_file.write(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+        self.store.metadata.insert(self.name, self.count, metadata)
+        self._lexical.add(item["text"] for item in metadata)
+
+        self.count += embeddings.shape[0]
+
+    def commit(self) -> int:
+        """
+        Make the segment durable and publish it to the store. Returns the
+        number of chunks of earlier document versions it replaced.
+        """
+
+        self._vectors_file.flush()
+        os.fsync(self._vectors_file.fileno())
+        self._vectors_file.close()
+        self._closed = True
+
+        os.replace(self._path + TMP_SUFFIX, self._path)
+
+        lexical = self._lexical.build()
+        lexical.save(lexical_path(self.store.storage_dir, self.name))
+
+        return self.store.commit_segment(self.name, self.count, lexical)
+
+    def abort(self) -> None:
+        if not self._closed:
+            self._vectors_file.close()
+            self._closed = True
+
+        remove_segment_files(self.store.storage_dir, self.name)
+        self.store.metadata.discard_segment(self.name)
+
+        logger.warning(f"Segment discarded | segment={self.name} | count={self.count}")
+
+    def __enter__(self) -> "SegmentWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+def merge_segment_files(storage_dir: str, names: List[str], merged_name: str) -> None:
+    """
+    Concatenate segments into a new durable segment. Rows keep their order,
+    so row positions in the in-memory index are unchanged by the merge.
+    """
+    for path_of in (segment_path, ids_path):
+        merged_path = path_of(storage_dir, merged_name)
+
+        with open(merged_path + TMP_SUFFIX, "wb") as out:
+            for name in names:
+                with open(path_of(storage_dir, name), "rb") as src:
+                    shutil.copyfileobj(src, out)
+
+            out.flush()
+            os.fsync(out.fileno())
+
+        os.replace(merged_path + TMP_SUFFIX, merged_path)
+
+    fsync_dir(storage_dir)
+
+
+def filter_segment_files(
+    storage_dir: str,
+    name: str,
+    filtered_name: str,
+    keep: np.ndarray,
+    embedding_dim: int,
+    batch_size: int
+) -> int:
+    """
+    Copy the rows of a segment selected by the boolean mask `keep` into a
+    new durable segment, in order. Returns the number of rows kept.
+    """
+    vectors = open_segment_vectors(storage_dir, name, embedding_dim)
+    ids = read_segment_ids(storage_dir, name)
+
+    path = segment_path(storage_dir, filtered_name)
+    with open(path + TMP_SUFFIX, "wb") as out:
+        for start in range(0, vectors.shape[0], batch_size):
+            rows = vectors[start:start + batch_size][keep[start:start + batch_size]]
+            out.write(np.ascontiguousarray(rows).tobytes())
+
+        out.flush()
+        os.fsync(out.fileno())
+
+    os.replace(path + TMP_SUFFIX, path)
+    write_segment_ids(storage_dir, filtered_name, ids[keep])
+
+    fsync_dir(storage_dir)
+
+    return int(keep.sum())
@@ -0,0 +1,146 @@
+"""
+Recall vs latency of the ANN index types against the exact Flat baseline.
+
+Usage:
+    python -m benchmarks.ann_benchmark                          # synthetic vectors
+    python -m benchmarks.ann_benchmark --index-dir app/storage/index
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from app.config import ANN_TRAIN_SAMPLE_SIZE, HNSW_EF_SEARCH, INDEX_DIR, IVF_NPROBE
+from app.vectorstore.index_factory import build_index, search_parameters, train_index
+from app.vectorstore.segments import iter_segment_vectors, read_manifest
+
+NPROBE_SWEEP = [1, 4, 8, IVF_NPROBE, 32, 64]
+EF_SEARCH_SWEEP = [16, 32, HNSW_EF_SEARCH, 128, 256]
+
+
+def load_corpus(index_dir: str) -> np.ndarray:
+    manifest = read_manifest(index_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No index manifest found in {index_dir}")
+
+    return np.vstack([
+        vectors
+        for seg in manifest["segments"]
+        for vectors in iter_segment_vectors(index_dir, seg["name"], manifest["embedding_dim"], 10_000)
+    ])
+
+
+def synthetic_corpus(num_vectors: int, dim: int, seed: int = 0) -> np.ndarray:
+    """
+    Clustered unit vectors, closer to real embedding distributions than uniform noise.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, num_vectors // 200), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), num_vectors)]
+    vectors += 0.5 * rng.standard_normal((num_vectors, dim)).astype(np.float32)
+    return normalize(vectors)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def make_queries(corpus: np.ndarray, num_queries: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picks = corpus[rng.integers(0, len(corpus), num_queries)]
+    return normalize(picks + 0.1 * rng.standard_normal(picks.shape).astype(np.float32))
+
+
+def timed_search(index: faiss.Index, queries: np.ndarray, k: int, params) -> Dict:
+    """
+    Search one query at a time, as the API does, and report per-query latency.
+    """
+    latencies = []
+    ids = np.empty((len(queries), k), dtype=np.int64)
+
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, found = index.search(query[None, :], k, params=params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids[i] = found[0]
+
+    return {
+        "ids": ids,
+        "mean_ms": float(np.mean(latencies)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def run(corpus: np.ndarray, queries: np.ndarray, k: int) -> List[Dict]:
+    dim = corpus.shape[1]
+    rows = []
+
+    baseline = build_index("flat", dim)
+    baseline.add(corpus)
+    exact = timed_search(baseline, queries, k, None)
+    rows.append({
+        "index": "flat", "param": "-", "recall": 1.0,
+        "mean_ms": exact["mean_ms"], "p95_ms": exact["p95_ms"],
+        "build_s": 0.0, "size_mb": faiss.serialize_index(baseline).nbytes / 1e6,
+    })
+
+    # train on the same sample size the store uses when promoting
+    rng = np.random.default_rng(0)
+    sample = corpus[rng.choice(len(corpus), min(ANN_TRAIN_SAMPLE_SIZE, len(corpus)), replace=False)]
+
+    for index_type in ("ivf_flat", "ivf_pq", "hnsw"):
+        start = time.perf_counter()
+        index = build_index(index_type, dim, len(corpus))
+        train_index(index, sample)
+        index.add(corpus)
+        build_seconds = time.perf_counter() - start
+        size_mb = faiss.serialize_index(index).nbytes / 1e6
+
+        if index_type == "hnsw":
+            sweep = [("efSearch", ef, search_parameters(index_type, ef_search=ef)) for ef in EF_SEARCH_SWEEP]
+        else:
+            sweep = [("nprobe", n, search_parameters(index_type, nprobe=n)) for n in NPROBE_SWEEP]
+
+        for name, value, params in sweep:
+            result = timed_search(index, queries, k, params)
+            rows.append({
+                "index": index_type, "param": f"{name}={value}",
+                "recall": recall_at_k(result["ids"], exact["ids"]),
+                "mean_ms": result["mean_ms"], "p95_ms": result["p95_ms"],
+                "build_s": build_seconds, "size_mb": size_mb,
+            })
+
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-dir", help=f"benchmark the vectors of an existing store (e.g. {INDEX_DIR})")
+    parser.add_argument("--num-vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.index_dir) if args.index_dir else synthetic_corpus(args.num_vectors, args.dim)
+    queries = make_queries(corpus, args.queries)
+
+    print(f"corpus={corpus.shape[0]} dim={corpus.shape[1]} queries={len(queries)} k={args.k}")
+    print(f"{'index':<10}{'param':<14}{'recall@k':>10}{'mean ms':>10}{'p95 ms':>10}{'build s':>10}{'size MB':>10}")
+
+    for row in run(corpus, queries, args.k):
+        print(
+            f"{row['index']:<10}{row['param']:<14}{row['recall']:>10.3f}{row['mean_ms']:>10.3f}"
+            f"{row['p95_ms']:>10.3f}{row['build_s']:>10.2f}{row['size_mb']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Throughput and memory of the LLM generation backends on the same prompts.
+
+Each backend is loaded in a fresh process so its resident memory is
+measured in isolation.
+
+Usage:
+    python -m benchmarks.llm_benchmark
+    python -m benchmarks.llm_benchmark --backends torch_fp32 torch_int8 onnx --max-new-tokens 64
+    python -m benchmarks.llm_benchmark --prompts-file prompts.json   # JSON list of strings
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from app.config import GENERATION_BATCH_SIZE, LLM_MODEL, MAX_NEW_TOKENS
+
+DEFAULT_BACKENDS = ["torch_fp32", "torch_int8", "onnx"]
+
+CONTEXT = (
+    "FAISS is a library for efficient similarity search and clustering of dense vectors. "
+    "It contains algorithms that search in sets of vectors of any size, up to ones that "
+    "possibly do not fit in RAM. IVF indexes partition the vectors into lists and only "
+    "scan the closest lists at query time, while HNSW builds a navigable graph."
+)
+
+DEFAULT_PROMPTS = [
+    f"Answer the question using ONLY the context below.\n\nContext:\n{CONTEXT}\n\n"
+    f"Question:\n{question}\n\nAnswer:"
+    for question in [
+        "What is FAISS?",
+        "How do IVF indexes reduce search time?",
+        "What does HNSW build?",
+        "Can FAISS search vector sets that do not fit in RAM?",
+        "Summarize the context.",
+        "List the index types mentioned.",
+        "What is clustered by FAISS?",
+        "Which index scans only the closest lists?",
+    ]
+]
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def generated_tokens(output, pad_token_id: int) -> int:
+    # drop the decoder start token; padding after EOS is not generated text
+    return int((output[:, 1:] != pad_token_id).sum())
+
+
+def benchmark_backend(backend: str, model_name: str, prompts: List[str], max_new_tokens: int) -> Dict:
+    """
+    Runs in a worker process: load one backend, then time sequential
+    single-prompt generation and one padded batch over the same prompts.
+    """
+    import torch
+    from transformers import AutoTokenizer
+
+    from app.llm.backends import load_model
+
+    rss_before = rss_mb()
+
+    start = time.perf_counter()
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = load_model(backend, model_name)
+    load_seconds = time.perf_counter() - start
+    rss_loaded = rss_mb()
+
+    def generate(batch: List[str]):
+        inputs = tokenizer(batch, return_tensors="pt", padding=True)
+        with torch.no_grad():
+            return model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=tokenizer.pad_token_id
+            )
+
+    # warm-up so one-off graph / kernel initialization is not timed
+    generate(prompts[:1])
+
+    tokens = 0
+    start = time.perf_counter()
+    for prompt in prompts:
+        tokens += generated_tokens(generate([prompt]), tokenizer.pad_token_id)
+    single_seconds = time.perf_counter() - start
+
+    batch_tokens = 0
+    start = time.perf_counter()
+    for i in range(0, len(prompts), GENERATION_BATCH_SIZE):
+        batch_tokens += generated_tokens(generate(prompts[i:i + GENERATION_BATCH_SIZE]), tokenizer.pad_token_id)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "load_s": load_seconds,
+        "model_rss_mb": rss_loaded - rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+        "single_tok_s": tokens / single_seconds,
+        "single_ms_per_prompt": 1000 * single_seconds / len(prompts),
+        "batch_tok_s": batch_tokens / batch_seconds,
+    }
+
+
+def run(backends: List[str], model_name: str, prompts: List[str], max_new_tokens: int) -> List[Dict]:
+    rows = []
+    context = multiprocessing.get_context("spawn")
+
+    for backend in backends:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                rows.append(executor.submit(
+                    benchmark_backend, backend, model_name, prompts, max_new_tokens
+                ).result())
+            except Exception as e:
+                rows.append({"backend": backend, "error": str(e)})
+
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=DEFAULT_BACKENDS)
+    parser.add_argument("--model", default=LLM_MODEL)
+    parser.add_argument("--prompts-file", help="JSON list of prompts (defaults to built-in RAG-style prompts)")
+    parser.add_argument("--max-new-tokens", type=int, default=min(MAX_NEW_TOKENS, 128))
+    args = parser.parse_args()
+
+    prompts = DEFAULT_PROMPTS
+    if args.prompts_file:
+        with open(args.prompts_file) as f:
+            prompts = json.load(f)
+
+    print(f"model={args.model} prompts={len(prompts)} max_new_tokens={args.max_new_tokens}")
+    print(
+        f"{'backend':<12}{'load s':>9}{'model MB':>10}{'peak MB':>10}"
+        f"{'tok/s':>9}{'ms/prompt':>11}{'batch tok/s':>13}"
+    )
+
+    for row in run(args.backends, args.model, prompts, args.max_new_tokens):
+        if "error" in row:
+            print(f"{row['backend']:<12}failed: {row['error']}")
+            continue
+
+        print(
+            f"{row['backend']:<12}{row['load_s']:>9.1f}{row['model_rss_mb']:>10.0f}{row['peak_rss_mb']:>10.0f}"
+            f"{row['single_tok_s']:>9.1f}{row['single_ms_per_prompt']:>11.0f}{row['batch_tok_s']:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Memory, disk size, recall@k and latency of the vector storage modes
+(float32 | fp16 | sq8 | pq) against the uncompressed exact index, with and
+without the exact float32 re-score of the shortlist.
+
+Usage:
+    python -m benchmarks.storage_benchmark                          # synthetic vectors
+    python -m benchmarks.storage_benchmark --index-dir app/storage/index --index-type hnsw
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from app.config import ANN_TRAIN_SAMPLE_SIZE, INDEX_DIR
+from app.vectorstore.faiss_store import exact_top_k
+from app.vectorstore.index_factory import (
+    INDEX_TYPES,
+    build_index,
+    index_memory_bytes,
+    is_compressed,
+    rescore_candidates,
+    search_parameters,
+    train_index,
+)
+from benchmarks.ann_benchmark import load_corpus, make_queries, recall_at_k, synthetic_corpus
+
+STORAGE_SWEEP = ["float32", "fp16", "sq8", "pq"]
+
+
+def timed_search(
+    index: faiss.Index,
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    params,
+    rescore_k: int = 0
+) -> Dict:
+    """
+    Search one query at a time, as the API does, and report per-query latency.
+    With rescore_k a shortlist of that size is re-scored against the float32
+    vectors (held in memory here; the store reads them from the page-cached
+    segment files).
+    """
+    latencies = []
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    rescore = rescore_k > 0
+    fetch_k = rescore_k if rescore else k
+
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, found = index.search(query[None, :], fetch_k, params=params)
+        if rescore:
+            shortlist = found[0][found[0] != -1]
+            _, found = exact_top_k(query[None, :], corpus[shortlist], shortlist, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids[i] = found[0]
+
+    return {
+        "ids": ids,
+        "mean_ms": float(np.mean(latencies)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def run(corpus: np.ndarray, queries: np.ndarray, k: int, index_type: str) -> List[Dict]:
+    dim = corpus.shape[1]
+    rows = []
+
+    baseline = build_index("flat", dim)
+    baseline.add(corpus)
+    exact = timed_search(baseline, corpus, queries, k, None)
+
+    # train on the same sample size the store uses when rebuilding
+    rng = np.random.default_rng(0)
+    sample = corpus[rng.choice(len(corpus), min(ANN_TRAIN_SAMPLE_SIZE, len(corpus)), replace=False)]
+
+    for storage in STORAGE_SWEEP:
+        start = time.perf_counter()
+        index = build_index(index_type, dim, len(corpus), storage)
+        train_index(index, sample)
+        index.add(corpus)
+        build_seconds = time.perf_counter() - start
+
+        memory_mb = index_memory_bytes(index_type, dim, len(corpus), storage) / 1e6
+        disk_mb = faiss.serialize_index(index).nbytes / 1e6
+        params = search_parameters(index_type, storage=storage)
+
+        for rescore in (False, True) if is_compressed(index_type, storage) else (False,):
+            rescore_k = rescore_candidates(index_type, storage, k) if rescore else 0
+            result = timed_search(index, corpus, queries, k, params, rescore_k)
+            rows.append({
+                "storage": storage, "rescore": rescore,
+                "recall": recall_at_k(result["ids"], exact["ids"]),
+                "mean_ms": result["mean_ms"], "p95_ms": result["p95_ms"],
+                "build_s": build_seconds, "memory_mb": memory_mb, "disk_mb": disk_mb,
+            })
+
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-dir", help=f"benchmark the vectors of an existing store (e.g. {INDEX_DIR})")
+    parser.add_argument("--index-type", choices=sorted(INDEX_TYPES - {"ivf_pq"}), default="flat")
+    parser.add_argument("--num-vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.index_dir) if args.index_dir else synthetic_corpus(args.num_vectors, args.dim)
+    queries = make_queries(corpus, args.queries)
+
+    print(
+        f"corpus={corpus.shape[0]} dim={corpus.shape[1]} queries={len(queries)} k={args.k} "
+        f"index={args.index_type} rescore_candidates={rescore_candidates(args.index_type, 'sq8', args.k)} "
+        f"(pq: {rescore_candidates(args.index_type, 'pq', args.k)})"
+    )
+    print(
+        f"{'storage':<10}{'rescore':<9}{'recall@k':>10}{'mean ms':>10}{'p95 ms':>10}"
+        f"{'build s':>10}{'memory MB':>11}{'disk MB':>10}"
+    )
+
+    for row in run(corpus, queries, args.k, args.index_type):
+        print(
+            f"{row['storage']:<10}{'yes' if row['rescore'] else 'no':<9}{row['recall']:>10.3f}"
+            f"{row['mean_ms']:>10.3f}{row['p95_ms']:>10.3f}{row['build_s']:>10.2f}"
+            f"{row['memory_mb']:>11.1f}{row['disk_mb']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import numpy as np
+
+from app.retrieval import retriever
+from app.vectorstore.lexical_index import reciprocal_rank_fusion
+
+DIM = 16
+KEYWORD_ONLY_ID = 99
+
+
+class VectorStub:
+    """
+    Stands in for FaissVectorStore.get_vectors.
+    """
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def get_vectors(self, vector_ids):
+        return np.vstack([self.vectors[vector_id] for vector_id in vector_ids])
+
+
+def unit(vector):
+    return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+
+def test_keyword_only_hit_survives_mmr(monkeypatch):
+    monkeypatch.setattr(retriever, "HYBRID_SEARCH", True)
+    monkeypatch.setattr(retriever, "MERGE_OVERLAPPING_HITS", False)
+
+    rng = np.random.default_rng(0)
+    query = unit(rng.standard_normal(DIM))
+
+    # twelve near-duplicate vector hits, and an exact-identifier chunk that
+    # only BM25 found and that is barely similar to the query
+    vectors = {i: unit(query + 0.1 * rng.standard_normal(DIM)) for i in range(12)}
+    orthogonal = rng.standard_normal(DIM)
+    orthogonal -= (orthogonal @ query) * query
+    vectors[KEYWORD_ONLY_ID] = unit(orthogonal + 0.1 * query)
+
+    fused = reciprocal_rank_fusion([np.arange(12), np.array([KEYWORD_ONLY_ID, 5, 7])], 12)
+    hits = [
+        {"vector_id": vector_id, "score": score, "doc_id": f"d{vector_id}", "start_char_pos": 0, "end_char_pos": 1}
+        for vector_id, score in fused
+    ]
+    assert KEYWORD_ONLY_ID in [hit["vector_id"] for hit in hits]
+
+    reranked = retriever.rerank_hits(query[None, :], [hits], VectorStub(vectors), top_k=4)[0]
+
+    assert len(reranked) == 4
+    assert KEYWORD_ONLY_ID in [hit["vector_id"] for hit in reranked]